@@ -1,16 +1,21 @@
 # backend/app/api/v1/endpoints/analysis.py
 
+import asyncio
 import uuid
 import json
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+import hashlib
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from app.schemas.analysis_schemas import AnalysisRequest, AnalysisResponse
-from app.services.text_processor import process_text
-from app.services.llm_service import extract_concepts, combine_concepts
-from app.services.embedding_service import generate_embedding
-from app.services.analysis_service import generate_full_analysis
-from app.utils.scraper import scrape_url, scraper_output_to_df
-import pandas as pd
+from app.services.analysis_service import FAST_STAGES, AnalysisPipeline, PipelineRun, pipeline_metrics, scrape_stage
+from app.core.config import LLM_STREAMING, PROFILING_ENABLED, STORED_ANALYSIS_MAX_AGE
+from app.core.http_cache import IMMUTABLE_CACHE_CONTROL, SerializedCache, cached_json_response
+from app.core.profiling import ProfileBusy, TaskProfile, profile_reports
+from app.services.refresh_service import tracked_author_url
+from app.utils.analysis_store import analysis_age, load_analysis, load_essay_insights, save_analysis
+from app.utils.corpus_store import content_hash
+from app.utils.crawl_scheduler import BACKGROUND, INTERACTIVE, crawl_scheduler
 import logging
+from typing import Optional
 from urllib.parse import urlparse
 
 router = APIRouter()
@@ -18,15 +23,33 @@ logger = logging.getLogger(__name__)
 
 # In-memory storage for analysis results (replace with a database in production)
 analysis_results = {}
+# Normalized URL -> task id of the analysis currently running for it
+inflight_analyses = {}
+# Serialized completed results by result id, and completed status payloads by task id
+result_cache = SerializedCache()
+status_cache = SerializedCache()
 
 @router.post("/", response_model=dict)
 async def analyze_url(request: AnalysisRequest, background_tasks: BackgroundTasks):
+    try:
+        existing_task_id = inflight_analyses.get(inflight_key(normalize_url(request.url), request.mode))
+    except ValueError:
+        existing_task_id = None
+    if existing_task_id is not None:
+        logger.info(f"Attaching request for {request.url} to in-flight task {existing_task_id}")
+        return {"task_id": existing_task_id, "status": "processing"}
+
+    stored_task_id = serve_stored_analysis(request.url)
+    if stored_task_id is not None:
+        return {"task_id": stored_task_id, "status": "completed"}
+
     task_id = str(uuid.uuid4())
     analysis_results[task_id] = {"status": "processing", "progress": 0, "total_essays": 0}
     
     try:
         normalized_url = normalize_url(request.url)
-        background_tasks.add_task(analyze_url_background, normalized_url, task_id)
+        inflight_analyses[inflight_key(normalized_url, request.mode)] = task_id
+        background_tasks.add_task(analyze_url_background, normalized_url, task_id, mode=request.mode)
         return {"task_id": task_id, "status": "processing"}
     except ValueError as e:
         logger.error(f"Error processing URL for task {task_id}: {str(e)}")
@@ -41,112 +64,162 @@ def normalize_url(url: str) -> str:
         normalized_url += f"?{parsed_url.query}"
     return normalized_url
 
-async def analyze_url_background(url: str, task_id: str):
+def coalescing_key(normalized_url: str) -> str:
+    parsed_url = urlparse(normalized_url)
+    key = f"{parsed_url.netloc.lower()}{parsed_url.path.rstrip('/')}"
+    if parsed_url.query:
+        key += f"?{parsed_url.query}"
+    return key
+
+def inflight_key(normalized_url: str, mode: str = "full") -> str:
+    # Fast and full analyses of the same URL produce different results, so they never coalesce
+    key = coalescing_key(normalized_url)
+    return key if mode == "full" else f"{key}#{mode}"
+
+def make_result_id(normalized_url: str, contents, mode: str = "full") -> str:
+    # Same author URL, mode and set of essays -> same result id, regardless of feed order
+    digest = hashlib.sha256(inflight_key(normalized_url, mode).encode("utf-8"))
+    for essay_hash in sorted(content_hash(content) for content in contents):
+        digest.update(essay_hash.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+def serve_stored_analysis(url: str):
+    # Tracked authors are kept fresh by the refresh daemon. If it has not confirmed the stored
+    # analysis lately (not deployed, or new posts waiting for the off-peak window), analyze live.
+    author_url = tracked_author_url(str(url))
+    stored = load_analysis(author_url) if author_url is not None else None
+    if stored is None:
+        return None
+    age = analysis_age(stored)
+    if age > STORED_ANALYSIS_MAX_AGE:
+        logger.info(f"Stored analysis for {author_url} is {age:.0f}s old; analyzing live")
+        return None
+    task_id = str(uuid.uuid4())
+    analysis_results[task_id] = {
+        "status": "completed",
+        "result": stored["result"],
+        "progress": 100,
+        "result_id": stored["result_id"],
+        "refreshed_at": stored["stored_at"]
+    }
+    status_cache.put(task_id, analysis_results[task_id])
+    if stored["result_id"] not in result_cache:
+        result_cache.put(stored["result_id"], stored["result"])
+    logger.info(f"Serving stored analysis {stored['result_id']} for {author_url} as task {task_id}")
+    return task_id
+
+async def refresh_analysis(url: str) -> dict:
+    """
+    Run an analysis of `url` at background crawl priority and return its final
+    status. Interactive requests arriving meanwhile attach to it.
+    """
+    normalized_url = normalize_url(url)
+    key = inflight_key(normalized_url)
+    task_id = inflight_analyses.get(key)
+    if task_id is None:
+        task_id = str(uuid.uuid4())
+        analysis_results[task_id] = {"status": "processing", "progress": 0, "total_essays": 0}
+        inflight_analyses[key] = task_id
+        await analyze_url_background(normalized_url, task_id, BACKGROUND)
+    else:
+        while analysis_results[task_id]["status"] == "processing":
+            await asyncio.sleep(1)
+    return analysis_results[task_id]
+
+async def analyze_url_background(url: str, task_id: str, priority: int = INTERACTIVE, profile: Optional[TaskProfile] = None, mode: str = "full"):
     try:
         logger.info(f"Starting background analysis for task {task_id}, URL: {url}")
-        scraped_data = await scrape_url(url)
-        logger.info(f"Scraped data: {json.dumps(scraped_data, indent=2)}")
-        df = scraper_output_to_df(scraped_data)
-        
-        if df.empty:
-            logger.warning(f"No posts were scraped from the URL: {url}")
-            raise ValueError(f"No posts were scraped from the URL: {url}. Please check if the URL is correct and accessible.")
-
-        logger.info(f"Number of posts scraped: {len(df)}")
-        all_insights = await process_posts(df, task_id)
-        logger.info(f"All insights: {json.dumps(all_insights, indent=2)}")
-        combined_insights = await generate_full_analysis(all_insights)
+        author_url = tracked_author_url(url)
+        run = PipelineRun(
+            url,
+            mode=mode,
+            priority=priority,
+            known_essays=load_essay_insights(author_url) if author_url is not None else None,
+            on_progress=progress_recorder(task_id),
+            essay_theme_recorder=lambda essay_number: partial_theme_recorder(task_id, essay_number),
+            overall_theme_recorder=overall_theme_recorder(task_id),
+            profile=profile,
+        )
+        if mode == "fast":
+            await fast_pipeline.run(run)
+        elif profile is None:
+            await api_pipeline.run(run)
+        else:
+            with profile.capture():
+                await profiling_pipeline.run(run)
+        combined_insights = run.result
         logger.info(f"Combined insights: {json.dumps(combined_insights, indent=2)}")
+        if run.essays and combined_insights['overall_analysis']['key_themes']:
+            result_cache.put(run.result_id, combined_insights)
         
         analysis_results[task_id] = {
             "status": "completed",
             "result": combined_insights,
-            "progress": 100
+            "progress": 100,
+            "result_id": run.result_id,
+            "stage_timings": run.timings
         }
+        status_cache.put(task_id, analysis_results[task_id])
+        # Only full analyses are stored; tracked authors are served the stored one in either mode
+        if author_url is not None and mode == "full" and combined_insights['overall_analysis']['key_themes']:
+            save_analysis(author_url, combined_insights, run.result_id, run.essays or None)
         logger.info(f"Analysis completed for task {task_id}. Result: {json.dumps(analysis_results[task_id], indent=2)}")
     except Exception as e:
         logger.error(f"Error in analyze_url_background for task {task_id}: {str(e)}")
         logger.exception("Full traceback:")
         analysis_results[task_id] = {"status": "error", "message": str(e)}
+    finally:
+        if inflight_analyses.get(inflight_key(url, mode)) == task_id:
+            del inflight_analyses[inflight_key(url, mode)]
+        if profile is not None:
+            # In case the task failed before capture() took over the reservation
+            profile.release()
     
     logger.info(f"Final analysis result for task {task_id}: {json.dumps(analysis_results[task_id], indent=2)}")
-    
-async def process_posts(df: pd.DataFrame, task_id: str) -> list:
-    all_insights = []
-    total_posts = len(df)
-    analysis_results[task_id]["total_essays"] = total_posts
-
-    for index, row in df.iterrows():
-        try:
-            processed_text = process_text(row['content'])
-            insights = await extract_concepts(processed_text['processed_text'])
-            all_insights.append(insights)
-            
-            progress = int((index + 1) / total_posts * 100)
-            update_progress(task_id, progress, index + 1)
-        except Exception as e:
-            logger.error(f"Error processing post {index + 1}: {str(e)}")
-    
-    if not all_insights:
-        raise ValueError("No posts were successfully analyzed. Please try again later or contact support if the issue persists.")
-    
-    return all_insights
 
-def update_progress(task_id: str, progress: int, essays_analyzed: int):
-    analysis_results[task_id]["progress"] = progress
-    analysis_results[task_id]["essays_analyzed"] = essays_analyzed
-    logger.info(f"Task {task_id}: Processed {essays_analyzed}/{analysis_results[task_id]['total_essays']} posts")
+async def scrape_with_result_id(run: PipelineRun):
+    await scrape_stage(run)
+    run.result_id = make_result_id(run.source, [post.content for post in run.posts], run.mode)
 
-async def analyze_multiple_essays(processed_essays: list) -> dict:
-    logger.info(f"Analyzing {len(processed_essays)} essays")
-    
-    all_concepts = [essay['insights']['key_themes'] for essay in processed_essays]
-    combined_concepts = await combine_concepts(all_concepts)
-    
-    return {
-        "insights": combined_concepts,
-        "avg_readability_score": 0,  # You might want to calculate this
-        "overall_sentiment": "Neutral",  # You might want to calculate this
-        "essays_analyzed": len(processed_essays),
-    }
+async def scrape_or_reuse_result(run: PipelineRun):
+    await scrape_with_result_id(run)
+    cached_result = result_cache.get(run.result_id)
+    if cached_result is not None:
+        # Ends the run: the essays are unchanged since this result was produced
+        logger.info(f"Essays unchanged since result {run.result_id}; reusing it")
+        run.result = json.loads(cached_result[0])
 
+api_pipeline = AnalysisPipeline(scrape=scrape_or_reuse_result)
+# Profiled runs always go through every stage rather than ending on a cached result
+profiling_pipeline = AnalysisPipeline(scrape=scrape_with_result_id)
+fast_pipeline = AnalysisPipeline(scrape=scrape_or_reuse_result, **FAST_STAGES)
 
-async def generate_full_analysis(processed_essays: list) -> dict:
-    try:
-        combined_analysis = await analyze_multiple_essays(processed_essays)
-        
-        result = {
-            "overall_analysis": {
-                "key_themes": combined_analysis['insights']['key_themes'],
-                "writing_style": "Analytical and informative",  # You might want to generate this dynamically
-                "readability_score": combined_analysis.get('avg_readability_score', 0),
-                "sentiment": combined_analysis.get('overall_sentiment', "Neutral"),
-                "post_count": len(processed_essays),
-            },
-            "essays": [
-                {"insights": {"key_themes": essay['insights']['key_themes']}} 
-                for essay in processed_essays
-            ]
-        }
-        
-        logger.info(f"Full analysis result: {json.dumps(result, indent=2)}")
-        return result
-    except Exception as e:
-        logger.error(f"Error in generate_full_analysis: {str(e)}", exc_info=True)
-        return {
-            "overall_analysis": {
-                "key_themes": [],
-                "writing_style": "Not available",
-                "readability_score": 0,
-                "sentiment": "Unknown",
-                "post_count": len(processed_essays),
-            },
-            "essays": []
-        }
-    
+def partial_theme_recorder(task_id: str, essay_number: int):
+    if not LLM_STREAMING:
+        return None
+
+    def record(theme: str):
+        analysis_results[task_id].setdefault("partial_insights", []).append({"essay": essay_number, "theme": theme})
+    return record
+
+def progress_recorder(task_id: str):
+    def record(essays_analyzed: int, total_essays: int):
+        analysis_results[task_id]["total_essays"] = total_essays
+        analysis_results[task_id]["progress"] = int(essays_analyzed / total_essays * 100)
+        analysis_results[task_id]["essays_analyzed"] = essays_analyzed
+        logger.info(f"Task {task_id}: Processed {essays_analyzed}/{total_essays} posts")
+    return record
+
+def overall_theme_recorder(task_id: str):
+    if not LLM_STREAMING:
+        return None
+
+    def record(theme):
+        analysis_results[task_id].setdefault("partial_overall_themes", []).append(theme)
+    return record
 
 @router.get("/status/{task_id}")
-async def get_analysis_status(task_id: str):
+async def get_analysis_status(task_id: str, request: Request):
     logger.info(f"Checking status for task: {task_id}")
     if task_id not in analysis_results:
         logger.warning(f"Task not found: {task_id}")
@@ -158,6 +231,62 @@ async def get_analysis_status(task_id: str):
             "status": "processing",
             "progress": status["progress"],
             "essays_analyzed": status.get("essays_analyzed", 0),
-            "total_essays": status.get("total_essays", 0)
+            "total_essays": status.get("total_essays", 0),
+            "partial_insights": status.get("partial_insights", []),
+            "partial_overall_themes": status.get("partial_overall_themes", [])
         }
-    return status
\ No newline at end of file
+    if status["status"] == "completed" and task_id in status_cache:
+        # A completed task never changes, so its payload is serialized once and revalidated by ETag
+        body, etag = status_cache.get(task_id)
+        return cached_json_response(request, body, etag, "public, max-age=3600")
+    return status
+
+@router.get("/result/{result_id}")
+async def get_analysis_result(result_id: str, request: Request):
+    cached_result = result_cache.get(result_id)
+    if cached_result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    body, etag = cached_result
+    return cached_json_response(request, body, etag, IMMUTABLE_CACHE_CONTROL)
+
+@router.get("/crawl/metrics")
+async def get_crawl_metrics():
+    return crawl_scheduler.metrics()
+
+@router.get("/pipeline/metrics")
+async def get_pipeline_metrics():
+    return pipeline_metrics.metrics()
+
+@router.post("/profile", response_model=dict)
+async def profile_analysis(request: AnalysisRequest, background_tasks: BackgroundTasks):
+    """
+    Run a fresh analysis of the URL under cProfile and tracemalloc. The report
+    is available from /profile/{task_id} once the task finishes.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    try:
+        normalized_url = normalize_url(request.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    task_id = str(uuid.uuid4())
+    # Claimed here, not when the task starts, so a concurrent request gets its 409 now
+    try:
+        profile = TaskProfile(task_id, normalized_url).reserve()
+    except ProfileBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    analysis_results[task_id] = {"status": "processing", "progress": 0, "total_essays": 0}
+    background_tasks.add_task(analyze_url_background, normalized_url, task_id, INTERACTIVE, profile)
+    return {"task_id": task_id, "status": "processing"}
+
+@router.get("/profile/{task_id}")
+async def get_profile_report(task_id: str):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    report = profile_reports.get(task_id)
+    if report is None:
+        if analysis_results.get(task_id, {}).get("status") == "processing":
+            return {"task_id": task_id, "status": "processing"}
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
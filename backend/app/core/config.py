@@ -8,4 +8,39 @@ LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "your-anthropic-api-key-here")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-openai-api-key-here")
 DATABASE_URL = os.getenv("DATABASE_URL")
-
+HTML_TEXT_BACKEND = os.getenv("HTML_TEXT_BACKEND", "stdlib")
+COMBINE_TOKEN_BUDGET = int(os.getenv("COMBINE_TOKEN_BUDGET", "6000"))
+COMBINE_BATCH_FANOUT = int(os.getenv("COMBINE_BATCH_FANOUT", "8"))
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+LLM_PROVIDERS = [name.strip() for name in os.getenv("LLM_PROVIDERS", LLM_PROVIDER).split(",") if name.strip()]
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+ANTHROPIC_CHAT_MODEL = os.getenv("ANTHROPIC_CHAT_MODEL", "claude-3-haiku-20240307")
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "1024"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "20"))
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai")
+CRAWL_REQUESTS_PER_SECOND = float(os.getenv("CRAWL_REQUESTS_PER_SECOND", "1"))
+CRAWL_BURST = float(os.getenv("CRAWL_BURST", "5"))
+ROBOTS_CACHE_TTL = float(os.getenv("ROBOTS_CACHE_TTL", "3600"))
+SITEMAP_FETCH_CONCURRENCY = int(os.getenv("SITEMAP_FETCH_CONCURRENCY", "4"))
+TRACKED_AUTHORS = [url.strip() for url in os.getenv("TRACKED_AUTHORS", "").split(",") if url.strip()]
+TRACKED_AUTHORS_FILE = os.getenv("TRACKED_AUTHORS_FILE", "tracked_authors.txt")
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "1800"))
+REFRESH_OFFPEAK_HOURS = os.getenv("REFRESH_OFFPEAK_HOURS", "1-6")
+REFRESH_DAILY_TOKEN_BUDGET = int(os.getenv("REFRESH_DAILY_TOKEN_BUDGET", "200000"))
+REFRESH_IN_PROCESS = os.getenv("REFRESH_IN_PROCESS", "false").lower() == "true"
+# Stored analyses the refresh daemon has not confirmed for this long are re-analyzed on request
+STORED_ANALYSIS_MAX_AGE = float(os.getenv("STORED_ANALYSIS_MAX_AGE", str(4 * REFRESH_INTERVAL)))
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR")
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0: one per available CPU, capped at 4
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_BATCH_WAIT_MS = float(os.getenv("LOCAL_EMBEDDING_BATCH_WAIT_MS", "5"))
+LOCAL_EMBEDDING_MAX_TOKENS = int(os.getenv("LOCAL_EMBEDDING_MAX_TOKENS", "256"))
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+PROFILE_MAX_REPORTS = int(os.getenv("PROFILE_MAX_REPORTS", "20"))
+KEYPHRASE_TOP_N = int(os.getenv("KEYPHRASE_TOP_N", "5"))
+KEYPHRASE_BACKGROUND_TTL = float(os.getenv("KEYPHRASE_BACKGROUND_TTL", "3600"))
+EXTRACT_INPUT_MAX_WORDS = int(os.getenv("EXTRACT_INPUT_MAX_WORDS", "0"))  # 0: send whole essays to the LLM
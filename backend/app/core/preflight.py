@@ -0,0 +1,82 @@
+# backend/app/core/preflight.py
+
+import logging
+import os
+import threading
+import time
+
+from app.core.config import EMBEDDING_PROVIDER
+from app.core.lazy_imports import lazy_import
+
+nltk = lazy_import("nltk")
+
+logger = logging.getLogger(__name__)
+
+NLTK_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "nltk_data"))
+
+# nltk.download name -> path nltk.data.find resolves it under
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+    "vader_lexicon": "sentiment/vader_lexicon.zip",
+}
+
+_nltk_lock = threading.Lock()
+_nltk_ready = False
+
+
+def ensure_nltk_resources():
+    """
+    Make sure the NLTK data process_text needs is available, downloading only
+    what is missing. Safe to call from any thread; the work happens once.
+    """
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        if NLTK_DATA_DIR not in nltk.data.path:
+            nltk.data.path.append(NLTK_DATA_DIR)
+        for name, path in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                logger.info(f"NLTK resource {name} not found, downloading")
+                nltk.download(name, quiet=True)
+        _nltk_ready = True
+
+
+def run_preflight():
+    """
+    Load per-request dependencies and data once, ahead of the first request.
+    """
+    started = time.perf_counter()
+    ensure_nltk_resources()
+
+    from app.services.text_processor import process_text
+    process_text("Preflight warm-up. This loads the tokenizer, stopwords and sentiment lexicon.")
+
+    for name in ("pandas", "feedparser", "openai", "pyarrow.parquet"):
+        lazy_import(name)._load()
+
+    # tiktoken may download its encoding file; never on the event loop
+    from app.services.llm_service import load_token_encoding
+    load_token_encoding()
+
+    # Fast-mode themes score against this; later rebuilds happen off the request path
+    from app.services.keyphrases import build_background_corpus
+    try:
+        build_background_corpus()
+    except Exception as e:
+        logger.error(f"Could not build the keyphrase background: {str(e)}")
+
+    if EMBEDDING_PROVIDER == "local":
+        # Load the ONNX model once per worker before the first embedding request
+        from app.services.local_embeddings import get_local_model
+        try:
+            get_local_model().embed_batch(["Preflight warm-up."])
+        except Exception as e:
+            logger.error(f"Could not load the local embedding model: {str(e)}")
+
+    logger.info(f"Preflight completed in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,159 @@
+# backend/app/core/profiling.py
+
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import PROFILE_MAX_REPORTS, PROFILE_TOP_N
+
+# Allocation frames that belong to the profiler itself or to import machinery
+_IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class ProfileBusy(RuntimeError):
+    pass
+
+
+class TaskProfile:
+    """
+    cProfile and tracemalloc around one analysis task, plus wall time, CPU time
+    and allocations per pipeline stage. Both profilers are process-wide, so
+    only one task is profiled at a time, and anything else the event loop runs
+    meanwhile shows up in the report too. Work handed to threads (page fetches,
+    local embeddings) counts towards CPU time and allocations but not towards
+    the function profile.
+    """
+
+    # The profile holding the single profiling slot, from reserve() until capture() ends
+    active: Optional["TaskProfile"] = None
+
+    def __init__(self, task_id: str, url: str, top_n: int = PROFILE_TOP_N):
+        self.task_id = task_id
+        self.url = url
+        self.top_n = top_n
+        self.stages: Dict[str, dict] = {}
+        self._stage_start: tuple = ()
+        self.report: Optional[dict] = None
+
+    def reserve(self) -> "TaskProfile":
+        """
+        Claim the profiling slot ahead of capture(), so a request can be
+        refused before its task is scheduled rather than failing later.
+        """
+        if TaskProfile.active is not None and TaskProfile.active is not self:
+            raise ProfileBusy(f"Task {TaskProfile.active.task_id} is already being profiled")
+        TaskProfile.active = self
+        return self
+
+    def release(self):
+        if TaskProfile.active is self:
+            TaskProfile.active = None
+
+    @contextmanager
+    def capture(self):
+        self.reserve()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        started_at = datetime.now(timezone.utc)
+        wall, cpu = time.perf_counter(), time.process_time()
+        error = None
+        profiler.enable()
+        try:
+            yield self
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            profiler.disable()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_ALLOCATIONS)
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self.release()
+            self.report = {
+                "task_id": self.task_id,
+                "url": self.url,
+                "started_at": started_at.isoformat(),
+                "status": "error" if error is not None else "completed",
+                "wall_seconds": round(wall, 3),
+                "cpu_seconds": round(cpu, 3),
+                "peak_traced_kb": round(peak / 1024, 1),
+                "stages": self.stages,
+                "top_functions": self._top_functions(profiler),
+                "top_allocations": self._top_allocations(snapshot),
+            }
+            profile_reports.put(self.task_id, self.report)
+
+    def stage_started(self, name: str):
+        tracemalloc.reset_peak()
+        self._stage_start = (time.perf_counter(), time.process_time(), tracemalloc.get_traced_memory()[0])
+
+    def stage_finished(self, name: str):
+        wall, cpu, traced = self._stage_start
+        current, peak = tracemalloc.get_traced_memory()
+        self.stages[name] = {
+            "wall_seconds": round(time.perf_counter() - wall, 3),
+            "cpu_seconds": round(time.process_time() - cpu, 3),
+            "retained_kb": round((current - traced) / 1024, 1),
+            "peak_kb": round((peak - traced) / 1024, 1),
+        }
+
+    def _top_functions(self, profiler: cProfile.Profile) -> List[dict]:
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        return [
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "own_seconds": round(own, 4),
+                "cumulative_seconds": round(cumulative, 4),
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows
+        ]
+
+    def _top_allocations(self, snapshot: tracemalloc.Snapshot) -> List[dict]:
+        # Memory allocated during the task and still held when it ended
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "blocks": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:self.top_n]
+        ]
+
+
+class ProfileReports:
+    """
+    The most recent profile reports by task id.
+    """
+
+    def __init__(self, max_entries: int = PROFILE_MAX_REPORTS):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, task_id: str) -> Optional[dict]:
+        return self.entries.get(task_id)
+
+    def put(self, task_id: str, report: dict):
+        self.entries[task_id] = report
+        self.entries.move_to_end(task_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+profile_reports = ProfileReports()
@@ -1,4 +1,3 @@
-from pymilvus import MilvusClient, DataType, FieldSchema, CollectionSchema
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,6 +6,8 @@ USE_MILVUS = False  # Set this to False to disable Milvus
 
 client = None
 if USE_MILVUS:
+    # pymilvus is only imported when Milvus is enabled
+    from pymilvus import MilvusClient, DataType, FieldSchema, CollectionSchema
     try:
         client = MilvusClient("milvus_demo.db")
     except Exception as e:
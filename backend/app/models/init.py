@@ -0,0 +1 @@
+# backend/app/models/init.py
\ No newline at end of file
@@ -0,0 +1,182 @@
+# backend/app/models/records.py
+
+import marshal
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable, List, Optional, Type, TypeVar
+
+from app.core.lazy_imports import lazy_import
+
+dateutil_parser = lazy_import("dateutil.parser")
+
+R = TypeVar("R", bound="Record")
+
+PACK_VERSION = 2
+
+_LIKE_COUNT = re.compile(r'^\s*([\d.,]+)\s*([kKmM]?)\s*$')
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an RFC 822 feed date ("Fri, 01 Mar 2024 12:00:00 GMT") or a post page
+    date ("Mar 1, 2024"). Returns None for placeholders and unparseable text.
+    """
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = dateutil_parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_like_count(value: Optional[str]) -> Optional[int]:
+    """
+    Parse "42", "1,204" or "1.2K". Returns None for placeholders such as "N/A".
+    """
+    match = _LIKE_COUNT.match(value or "")
+    if not match:
+        return None
+    number, suffix = match.groups()
+    try:
+        count = float(number.replace(",", ""))
+    except ValueError:
+        return None
+    return int(round(count * {"": 1, "k": 1_000, "m": 1_000_000}[suffix.lower()]))
+
+
+class Record:
+    """
+    Base for the pipeline's slotted records: fields are declared in `__slots__`
+    and records convert to and from plain tuples for packing.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name in self.__slots__[len(args):]:
+            setattr(self, name, kwargs.pop(name))
+        if kwargs:
+            raise TypeError(f"Unexpected fields for {type(self).__name__}: {', '.join(kwargs)}")
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def to_tuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls: Type[R], values: tuple) -> R:
+        return cls(*values)
+
+
+class Post(Record):
+    __slots__ = ("title", "subtitle", "url", "content", "published", "like_count")
+
+    title: str
+    subtitle: str
+    url: str
+    content: str
+    published: Optional[datetime]
+    like_count: Optional[int]
+
+    @classmethod
+    def from_strings(cls, title: str, subtitle: str, url: str, content: str, date: str, like_count: str) -> "Post":
+        return cls(title, subtitle, url, content, parse_date(date), parse_like_count(like_count))
+
+    def to_row(self) -> dict:
+        """
+        The post as the string columns written to CSV and the corpus store.
+        """
+        return {
+            "title": self.title,
+            "subtitle": self.subtitle,
+            "url": self.url,
+            "content": self.content,
+            "date": self.published.isoformat() if self.published is not None else "",
+            "like_count": str(self.like_count) if self.like_count is not None else "",
+        }
+
+    def to_tuple(self) -> tuple:
+        published = self.published.timestamp() if self.published is not None else None
+        return (self.title, self.subtitle, self.url, self.content, published, self.like_count)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> "Post":
+        title, subtitle, url, content, published, like_count = values
+        if published is not None:
+            published = datetime.fromtimestamp(published, tz=timezone.utc)
+        return cls(title, subtitle, url, content, published, like_count)
+
+
+# Per-essay style measurements shared by ProcessedText and EssayInsights
+STYLE_FIELDS = (
+    "sentence_count", "word_count", "readability_score", "sentiment", "sentiment_score",
+    "mean_sentence_length", "sentence_length_std", "vocabulary_richness",
+)
+
+
+class ProcessedText(Record):
+    __slots__ = ("processed_text",) + STYLE_FIELDS
+
+    processed_text: str
+    sentence_count: int
+    word_count: int
+    readability_score: float
+    sentiment: str
+    sentiment_score: float
+    mean_sentence_length: float
+    sentence_length_std: float
+    vocabulary_richness: float
+
+
+class EssayInsights(Record):
+    __slots__ = ("content_hash", "key_themes") + STYLE_FIELDS
+
+    content_hash: str
+    key_themes: List[str]
+    sentence_count: int
+    word_count: int
+    readability_score: float
+    sentiment: str
+    sentiment_score: float
+    mean_sentence_length: float
+    sentence_length_std: float
+    vocabulary_richness: float
+
+    @classmethod
+    def from_processed(cls, content_hash: str, key_themes: List[str], processed: ProcessedText) -> "EssayInsights":
+        return cls(content_hash, key_themes, *(getattr(processed, name) for name in STYLE_FIELDS))
+
+    def to_tuple(self) -> tuple:
+        return (self.content_hash, tuple(self.key_themes)) + tuple(getattr(self, name) for name in STYLE_FIELDS)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> "EssayInsights":
+        return cls(values[0], list(values[1]), *values[2:])
+
+
+def pack_records(records: Iterable[Record]) -> bytes:
+    """
+    Serialize records of one type to a compact binary blob. Uses marshal, so
+    blobs are meant for this deployment's task and analysis stores, not for
+    exchange between Python versions.
+    """
+    return marshal.dumps((PACK_VERSION, tuple(record.to_tuple() for record in records)))
+
+
+def unpack_records(record_type: Type[R], blob: bytes) -> List[R]:
+    version, rows = marshal.loads(blob)
+    if version != PACK_VERSION:
+        raise ValueError(f"Unsupported record pack version: {version}")
+    return [record_type.from_tuple(row) for row in rows]
@@ -1,9 +1,11 @@
 # backend/app/schemas/analysis_schemas.py
 
+from typing import Literal
 from pydantic import BaseModel, HttpUrl, Field
 
 class AnalysisRequest(BaseModel):
     url: HttpUrl = Field(..., description="URL of the article to analyze")
+    mode: Literal["full", "fast"] = Field("full", description="\"fast\" returns locally extracted keyphrases as themes in milliseconds, without the LLM")
 
 class AnalysisResponse(BaseModel):
     insights: str
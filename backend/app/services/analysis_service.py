@@ -1,103 +1,277 @@
 # backend/app/services/analysis_service.py
 
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.core.config import EXTRACT_INPUT_MAX_WORDS, KEYPHRASE_TOP_N
+from app.core.profiling import TaskProfile
+from app.models.records import EssayInsights, Post, ProcessedText
+from app.services.dedup_service import cluster_near_duplicates, corpus_index, minhash_signature
+from app.services.embedding_service import generate_embedding
+from app.services.keyphrases import KeyphraseModel, get_background_corpus
+from app.services.stylometry import aggregate_style
+from app.services.text_processor import process_text
+from app.utils.corpus_store import content_hash, read_posts
+from app.utils.crawl_scheduler import INTERACTIVE
+from app.utils.scraper import author_key, scrape_url
 from .llm_service import extract_concepts, combine_concepts
 
 logger = logging.getLogger(__name__)
 
-async def generate_analysis(processed_text: Dict[str, Any]) -> Dict[str, Any]:
+STAGES = ("scrape", "preprocess", "extract", "embed", "combine")
+MODES = ("full", "fast")
+ESSAY_KEYPHRASES = 3
+
+ThemeCallback = Optional[Callable[[str], None]]
+
+
+class PipelineRun:
     """
-    Generate analysis for a single essay.
+    Everything one analysis run reads and produces. Each stage fills in its
+    part; a stage that sets `result` ends the run early.
     """
-    logger.info("Generating analysis for single essay")
-    
-    try:
-        concepts_result = await extract_concepts(processed_text['processed_text'])
-        
-        analysis = {
-            "insights": {
-                "key_themes": concepts_result['insights']['key_themes']
-            },
-            "readability_score": processed_text['readability_score'],
-            "sentiment": processed_text['sentiment']
-        }
-        
-        logger.info("Analysis generated successfully for single essay")
-        return analysis
-    
-    except Exception as e:
-        logger.error(f"Error in generate_analysis: {str(e)}", exc_info=True)
+
+    __slots__ = (
+        "source", "mode", "priority", "known_essays", "on_progress", "essay_theme_recorder",
+        "overall_theme_recorder", "posts", "processed", "essays", "embeddings",
+        "result", "result_id", "timings", "profile",
+    )
+
+    def __init__(
+        self,
+        source: str,
+        mode: str = "full",
+        priority: int = INTERACTIVE,
+        known_essays: Optional[List[EssayInsights]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        essay_theme_recorder: Optional[Callable[[int], ThemeCallback]] = None,
+        overall_theme_recorder: ThemeCallback = None,
+        profile: Optional[TaskProfile] = None,
+    ):
+        self.source = source
+        self.mode = mode
+        self.priority = priority
+        self.known_essays = known_essays or []
+        self.on_progress = on_progress
+        self.essay_theme_recorder = essay_theme_recorder
+        self.overall_theme_recorder = overall_theme_recorder
+        self.posts: List[Post] = []
+        self.processed: List[Tuple[str, ProcessedText]] = []
+        self.essays: List[EssayInsights] = []
+        self.embeddings: Dict[str, List[float]] = {}
+        self.result: Optional[dict] = None
+        self.result_id: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.profile = profile
+
+
+Stage = Callable[[PipelineRun], Awaitable[None]]
+
+
+class StageMetrics:
+    """
+    Cumulative per-stage wall time across every run in this process.
+    """
+
+    def __init__(self):
+        self.runs = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def record(self, stage: str, seconds: float):
+        self.runs[stage] += 1
+        self.seconds[stage] += seconds
+
+    def metrics(self) -> dict:
         return {
-            "insights": {
-                "key_themes": ["Error generating concepts"]
-            },
-            "readability_score": 0,
-            "sentiment": "Unknown"
+            stage: {
+                "runs": self.runs[stage],
+                "total_seconds": round(self.seconds[stage], 3),
+                "avg_seconds": round(self.seconds[stage] / self.runs[stage], 3),
+            }
+            for stage in STAGES if self.runs[stage]
         }
 
-async def analyze_multiple_essays(processed_essays: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+pipeline_metrics = StageMetrics()
+
+
+async def scrape_stage(run: PipelineRun):
+    scraped_data = await scrape_url(run.source, run.priority)
+    run.posts = scraped_data['posts']
+    if not run.posts:
+        logger.warning(f"No posts were scraped from the URL: {run.source}")
+        raise ValueError(f"No posts were scraped from the URL: {run.source}. Please check if the URL is correct and accessible.")
+    logger.info(f"Number of posts scraped: {len(run.posts)}")
+
+
+async def corpus_stage(run: PipelineRun):
     """
-    Analyze multiple essays and combine their results.
+    Scrape stage for batch runs: `source` is an author in the corpus store.
     """
-    logger.info(f"Analyzing {len(processed_essays)} essays")
-    
-    all_concepts = []
-    total_readability = 0
-    sentiments = []
-    individual_essay_insights = []
-
-    for essay in processed_essays:
-        analysis = await generate_analysis(essay)
-        all_concepts.append(analysis['insights']['key_themes'])
-        total_readability += analysis['readability_score']
-        sentiments.append(analysis['sentiment'])
-        individual_essay_insights.append(analysis['insights'])
+    df = read_posts(run.source, columns=['title', 'subtitle', 'url', 'content', 'date', 'like_count'])
+    run.posts = [Post.from_strings(**row) for row in df.to_dict('records')]
+    if not run.posts:
+        raise ValueError(f"No stored posts for {run.source}")
+    logger.info(f"Read {len(run.posts)} stored posts for {run.source}")
+
+
+async def preprocess_stage(run: PipelineRun):
+    for index, post in enumerate(run.posts):
+        try:
+            run.processed.append((content_hash(post.content), process_text(post.content)))
+        except Exception as e:
+            logger.error(f"Error processing post {index + 1}: {str(e)}")
+
+
+async def generate_analysis(processed_text: ProcessedText, content_hash: str = "", on_theme: ThemeCallback = None, signature=None, llm_text: Optional[str] = None) -> EssayInsights:
+    """
+    Generate analysis for a single essay, reusing insights from a near-duplicate
+    essay in the cached corpus when there is one. `llm_text` replaces the
+    processed text in the LLM request, e.g. a condensed version of it.
+    """
+    if signature is not None:
+        cached = corpus_index.query(signature)
+        if cached is not None:
+            logger.info("Reusing insights from a near-duplicate essay in the cached corpus")
+            return EssayInsights.from_processed(content_hash, cached['insights']['key_themes'], processed_text)
+    insights = await extract_concepts(llm_text or processed_text.processed_text, on_theme)
+    if signature is not None and insights['insights']['key_themes']:
+        corpus_index.add(content_hash, signature, insights)
+    return EssayInsights.from_processed(content_hash, insights['insights']['key_themes'], processed_text)
+
+
+async def extract_stage(run: PipelineRun):
+    """
+    Send every distinct essay to the LLM exactly once. Essays already in the
+    stored analysis, near-duplicates within this run (cross-posts, lightly
+    edited reprints) and near-duplicates of recently analyzed essays reuse
+    earlier insights.
+    """
+    total = len(run.posts)
+    known_by_hash = {essay.content_hash: essay for essay in run.known_essays}
+    signatures = [minhash_signature(processed.processed_text) for _, processed in run.processed]
+    representatives = cluster_near_duplicates(signatures)
+    essays: List[Optional[EssayInsights]] = []
+    condenser = await essay_condenser(run)
+    if run.on_progress is not None:
+        run.on_progress(0, total)
+
+    for position, (essay_hash, processed) in enumerate(run.processed):
+        try:
+            representative = representatives[position]
+            if essay_hash in known_by_hash:
+                logger.info(f"Post {position + 1} is unchanged since the stored analysis; reusing its insights")
+                essay = EssayInsights.from_processed(essay_hash, known_by_hash[essay_hash].key_themes, processed)
+            elif representative != position and essays[representative] is not None:
+                logger.info(f"Post {position + 1} is a near-duplicate of post {representative + 1}; reusing its insights")
+                essay = EssayInsights.from_processed(essay_hash, essays[representative].key_themes, processed)
+            else:
+                on_theme = run.essay_theme_recorder(position + 1) if run.essay_theme_recorder else None
+                llm_text = condenser.condense(position, EXTRACT_INPUT_MAX_WORDS) if condenser is not None else None
+                essay = await generate_analysis(processed, essay_hash, on_theme, signatures[position], llm_text)
+        except Exception as e:
+            logger.error(f"Error processing post {position + 1}: {str(e)}")
+            essay = None
+        essays.append(essay)
+        if run.on_progress is not None:
+            run.on_progress(position + 1, total)
+
+    run.essays = [essay for essay in essays if essay is not None]
+    if not run.essays:
+        raise ValueError("No posts were successfully analyzed. Please try again later or contact support if the issue persists.")
 
+
+def corpus_author(source: str) -> str:
+    # API runs are keyed by URL, batch runs (corpus_stage) by the stored author name
     try:
-        combined_concepts = await combine_concepts(all_concepts)
-        avg_readability = total_readability / len(processed_essays) if processed_essays else 0
-        overall_sentiment = max(set(sentiments), key=sentiments.count) if sentiments else "Unknown"
-
-        combined_analysis = {
-            "insights": combined_concepts,
-            "avg_readability_score": avg_readability,
-            "overall_sentiment": overall_sentiment,
-            "essays_analyzed": len(processed_essays),
-            "individual_essay_insights": individual_essay_insights
-        }
+        return author_key(source)
+    except ValueError:
+        return source
+
 
-        logger.info("Combined analysis generated successfully")
-        return combined_analysis
+async def keyphrase_model(run: PipelineRun) -> KeyphraseModel:
+    return KeyphraseModel(
+        [processed.processed_text for _, processed in run.processed],
+        get_background_corpus(),
+        corpus_author(run.source),
+    )
 
+
+async def essay_condenser(run: PipelineRun) -> Optional[KeyphraseModel]:
+    # Only worth building when some essay is over the LLM input limit
+    if not EXTRACT_INPUT_MAX_WORDS or all(processed.word_count <= EXTRACT_INPUT_MAX_WORDS for _, processed in run.processed):
+        return None
+    try:
+        return await keyphrase_model(run)
     except Exception as e:
-        logger.error(f"Error in analyze_multiple_essays: {str(e)}", exc_info=True)
-        return {
-            "insights": {"key_themes": []},
-            "avg_readability_score": 0,
-            "overall_sentiment": "Unknown",
-            "essays_analyzed": len(processed_essays),
-            "individual_essay_insights": []
-        }
+        logger.error(f"Could not build keyphrase model, sending whole essays: {str(e)}")
+        return None
+
+
+async def keyphrase_stage(run: PipelineRun):
+    """
+    Extract stage for fast mode: themes are the top TF-IDF keyphrases of the
+    author's essays, computed locally. Sets the result, so the run ends here
+    without any LLM call.
+    """
+    if not run.processed:
+        raise ValueError("No posts could be processed.")
+    model = await keyphrase_model(run)
+    run.essays = [
+        EssayInsights.from_processed(essay_hash, model.essay_phrases(position, ESSAY_KEYPHRASES), processed)
+        for position, (essay_hash, processed) in enumerate(run.processed)
+    ]
+    if run.on_progress is not None:
+        run.on_progress(len(run.essays), len(run.essays))
+    run.result = format_analysis(run.essays, model.top_phrases(KEYPHRASE_TOP_N), aggregate_style(run.essays))
+
+
+async def embed_stage(run: PipelineRun):
+    # Identical essays share one embedding call
+    texts = {essay_hash: processed.processed_text for essay_hash, processed in run.processed}
+    embeddings = await asyncio.gather(*(generate_embedding(text) for text in texts.values()))
+    run.embeddings = dict(zip(texts, embeddings))
+
+
+async def analyze_multiple_essays(processed_essays: List[EssayInsights], on_theme: ThemeCallback = None) -> dict:
+    logger.info(f"Analyzing {len(processed_essays)} essays")
+
+    all_concepts = [essay.key_themes for essay in processed_essays]
+    combined_concepts = await combine_concepts(all_concepts, on_theme)
+
+    return {
+        "insights": combined_concepts,
+        "style": aggregate_style(processed_essays),
+        "essays_analyzed": len(processed_essays),
+    }
+
 
-async def generate_full_analysis(processed_essays: List[Dict[str, Any]]) -> Dict[str, Any]:
-    logger.info("Generating full analysis")
+def format_analysis(processed_essays: List[EssayInsights], key_themes: list, style: dict) -> dict:
+    return {
+        "overall_analysis": {
+            "key_themes": key_themes,
+            "writing_style": style['writing_style'],
+            "readability_score": style['readability_score'],
+            "sentiment": style['sentiment'],
+            "sentiment_distribution": style['sentiment_distribution'],
+            "style_metrics": style['style_metrics'],
+            "post_count": len(processed_essays),
+        },
+        "essays": [
+            {"insights": {"key_themes": essay.key_themes}}
+            for essay in processed_essays
+        ]
+    }
 
+
+async def generate_full_analysis(processed_essays: List[EssayInsights], on_theme: ThemeCallback = None) -> dict:
     try:
-        combined_analysis = await analyze_multiple_essays(processed_essays)
-        
-        result = {
-            "overall_analysis": {
-                "key_themes": combined_analysis['key_themes'],
-                "writing_style": "Analytical and informative",
-                "readability_score": combined_analysis.get('avg_readability_score', 0),
-                "sentiment": combined_analysis.get('overall_sentiment', "Neutral"),
-                "post_count": len(processed_essays),
-            },
-            "essays": processed_essays
-        }
-        
+        combined_analysis = await analyze_multiple_essays(processed_essays, on_theme)
+        result = format_analysis(processed_essays, combined_analysis['insights']['key_themes'], combined_analysis['style'])
+
         logger.info(f"Full analysis result: {json.dumps(result, indent=2)}")
         return result
     except Exception as e:
@@ -111,4 +285,56 @@ async def generate_full_analysis(processed_essays: List[Dict[str, Any]]) -> Dict
                 "post_count": len(processed_essays),
             },
             "essays": []
-        }
\ No newline at end of file
+        }
+
+
+async def combine_stage(run: PipelineRun):
+    run.result = await generate_full_analysis(run.essays, run.overall_theme_recorder)
+
+
+DEFAULT_STAGES: Dict[str, Optional[Stage]] = {
+    "scrape": scrape_stage,
+    "preprocess": preprocess_stage,
+    "extract": extract_stage,
+    "embed": None,  # embeddings are not part of the served result, so off unless asked for
+    "combine": combine_stage,
+}
+
+# Fast mode swaps the LLM extract stage for local keyphrases, which also produce the result
+FAST_STAGES: Dict[str, Optional[Stage]] = {"extract": keyphrase_stage}
+
+
+class AnalysisPipeline:
+    """
+    scrape -> preprocess -> extract -> embed -> combine. Any stage can be
+    replaced or disabled (None); each stage's wall time is recorded on the run
+    and in `pipeline_metrics`, and profiled runs also get CPU time and
+    allocations per stage.
+    """
+
+    def __init__(self, **stages: Optional[Stage]):
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+        self.stages = dict(DEFAULT_STAGES, **stages)
+
+    async def run(self, run: PipelineRun) -> PipelineRun:
+        for name in STAGES:
+            stage = self.stages[name]
+            if stage is None:
+                continue
+            if run.profile is not None:
+                run.profile.stage_started(name)
+            started = time.perf_counter()
+            try:
+                await stage(run)
+            finally:
+                elapsed = time.perf_counter() - started
+                run.timings[name] = round(elapsed, 3)
+                pipeline_metrics.record(name, elapsed)
+                if run.profile is not None:
+                    run.profile.stage_finished(name)
+            if run.result is not None:
+                break
+        logger.info(f"Pipeline timings for {run.source}: {run.timings}")
+        return run
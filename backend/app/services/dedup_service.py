@@ -0,0 +1,152 @@
+# backend/app/services/dedup_service.py
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import mmh3
+
+from app.core.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands of 8 rows puts the LSH candidate threshold near 0.7 Jaccard
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+MAX_CORPUS_ENTRIES = 10000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_permutations = None
+
+
+def _hash_permutations():
+    global _permutations
+    if _permutations is None:
+        # Fixed seed so signatures stay comparable across processes and restarts
+        rng = np.random.RandomState(1)
+        _permutations = (
+            rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64),
+            rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64),
+        )
+    return _permutations
+
+
+def shingles(processed_text: str, size: int = SHINGLE_SIZE) -> set:
+    tokens = processed_text.split()
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signature(processed_text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature over word shingles of the already-processed text.
+    Returns None for texts too short to compare.
+    """
+    shingle_set = shingles(processed_text)
+    if not shingle_set:
+        return None
+    hashes = np.fromiter((mmh3.hash(s, signed=False) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    perm_a, perm_b = _hash_permutations()
+    permuted = (hashes[:, None] * perm_a + perm_b) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [
+        (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+        for band in range(BANDS)
+    ]
+
+
+class MinHashIndex:
+    """
+    LSH index over MinHash signatures. Oldest entries are evicted once
+    `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int = MAX_CORPUS_ENTRIES):
+        self.max_entries = max_entries
+        self.buckets: Dict[Tuple[int, bytes], set] = defaultdict(set)
+        self.entries: "OrderedDict[str, Tuple[np.ndarray, dict]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, key: str, signature: np.ndarray, value: dict):
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (signature, value)
+        for band_key in _band_keys(signature):
+            self.buckets[band_key].add(key)
+        while len(self.entries) > self.max_entries:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key: str):
+        signature, _ = self.entries.pop(key)
+        for band_key in _band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def query(self, signature: np.ndarray, threshold: float = SIMILARITY_THRESHOLD) -> Optional[dict]:
+        """
+        Return the value stored for the most similar entry at or above `threshold`.
+        """
+        candidates = set()
+        for band_key in _band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        best_key, best_score = None, threshold
+        for key in candidates:
+            score = estimated_similarity(signature, self.entries[key][0])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return self.entries[best_key][1] if best_key is not None else None
+
+
+def cluster_near_duplicates(signatures: List[Optional[np.ndarray]], threshold: float = SIMILARITY_THRESHOLD) -> List[int]:
+    """
+    For each signature, return the index of its cluster representative (the
+    earliest member of the cluster). Texts without a signature represent themselves.
+    """
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+    for i, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        candidates = set()
+        for band_key in _band_keys(signature):
+            candidates.update(buckets[band_key])
+            buckets[band_key].append(i)
+        for j in candidates:
+            if estimated_similarity(signature, signatures[j]) >= threshold:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return [find(i) for i in range(len(signatures))]
+
+
+# Insights for essays analyzed earlier in this process, keyed by content hash
+corpus_index = MinHashIndex()
@@ -1,16 +1,31 @@
 # embedding_service.py
 
-from openai import AsyncOpenAI
-from app.core.config import LLM_PROVIDER, OPENAI_API_KEY
+from app.core.config import EMBEDDING_PROVIDER, OPENAI_API_KEY
+from app.core.lazy_imports import lazy_import
+from app.core.singleflight import SingleFlight, input_key
+from app.services.local_embeddings import get_local_embedder
 import logging
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+openai = lazy_import("openai")
+
+_client = None
+_inflight_embeddings = SingleFlight()
 logger = logging.getLogger(__name__)
 
+def get_client():
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
 async def generate_embedding(text: str) -> list[float]:
-    if LLM_PROVIDER == "openai":
+    # Identical texts already being embedded share the pending request
+    return await _inflight_embeddings.do(input_key("embedding", EMBEDDING_PROVIDER, text), lambda: _generate_embedding(text))
+
+async def _generate_embedding(text: str) -> list[float]:
+    if EMBEDDING_PROVIDER == "openai":
         try:
-            response = await client.embeddings.create(
+            response = await get_client().embeddings.create(
                 input=text,
                 model="text-embedding-3-small"
             )
@@ -22,5 +37,14 @@ async def generate_embedding(text: str) -> list[float]:
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
             return []
+    elif EMBEDDING_PROVIDER == "local":
+        try:
+            # Concurrent callers are batched into one ONNX Runtime call
+            embedding = await get_local_embedder().embed(text)
+            logger.info(f"Generated local embedding of length: {len(embedding)}")
+            return embedding
+        except Exception as e:
+            logger.error(f"Error generating local embedding: {str(e)}")
+            return []
     else:
-        raise ValueError(f"Unsupported LLM provider: {LLM_PROVIDER}")
\ No newline at end of file
+        raise ValueError(f"Unsupported embedding provider: {EMBEDDING_PROVIDER}")
\ No newline at end of file
@@ -0,0 +1,206 @@
+# backend/app/services/keyphrases.py
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import KEYPHRASE_BACKGROUND_TTL
+from app.core.lazy_imports import lazy_import
+from app.services.text_processor import content_tokens
+from app.utils.corpus_store import list_authors, read_posts
+
+np = lazy_import("numpy")
+sparse = lazy_import("scipy.sparse")
+
+logger = logging.getLogger(__name__)
+
+CONDENSE_WINDOW = 40  # words per passage when condensing an essay for the LLM
+PHRASE_SUBSUME_RATIO = 0.5
+SELECT_CANDIDATES_PER_THEME = 20
+
+
+def phrase_terms(tokens: List[str]) -> List[str]:
+    """
+    Candidate keyphrases of a processed text: every token and every pair of
+    adjacent tokens.
+    """
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+class BackgroundCorpus:
+    """
+    Document frequencies of every keyphrase across the stored corpus, so terms
+    common to all writers score lower than the ones an author keeps returning to.
+    `authors` are the authors whose stored essays it was built from.
+    """
+
+    def __init__(self, doc_freq: Dict[str, int], documents: int, authors: Iterable[str] = ()):
+        self.doc_freq = doc_freq
+        self.documents = documents
+        self.authors = frozenset(authors)
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], authors: Iterable[str] = ()) -> "BackgroundCorpus":
+        doc_freq: Counter = Counter()
+        documents = 0
+        for text in texts:
+            doc_freq.update(set(phrase_terms(content_tokens(text))))
+            documents += 1
+        return cls(dict(doc_freq), documents, authors)
+
+    def idf(self, terms: List[str], author_doc_freq: "np.ndarray", author_documents: int, author: Optional[str] = None) -> "np.ndarray":
+        # The author's own essays count towards the background, so an empty corpus degrades to plain TF-IDF.
+        # Their stored essays are already in it when the author was part of the build; don't count them twice.
+        if author is not None and author in self.authors:
+            author_doc_freq, author_documents = 0, 0
+        background = np.fromiter((self.doc_freq.get(term, 0) for term in terms), dtype=float, count=len(terms))
+        return np.log((1 + self.documents + author_documents) / (1 + background + author_doc_freq)) + 1
+
+
+# The corpus and when it was built, swapped together once a rebuild finishes. Empty until the first build.
+_background: Tuple[BackgroundCorpus, Optional[float]] = (BackgroundCorpus({}, 0), None)
+_rebuild_lock = threading.Lock()
+
+
+def _build_background_corpus() -> BackgroundCorpus:
+    global _background
+    started = time.perf_counter()
+    authors = list_authors()
+    texts = (
+        content
+        for author in authors
+        for content in read_posts(author, columns=['content'])['content']
+    )
+    corpus = BackgroundCorpus.from_texts(texts, authors)
+    _background = (corpus, time.monotonic())
+    logger.info(f"Built keyphrase background from {corpus.documents} stored essays in {time.perf_counter() - started:.2f}s")
+    return corpus
+
+
+def build_background_corpus() -> BackgroundCorpus:
+    """
+    Build the background corpus from every author in the corpus store now and
+    swap it in. Blocking; preflight calls it so requests find it ready.
+    """
+    with _rebuild_lock:
+        return _build_background_corpus()
+
+
+def _rebuild_in_background():
+    try:
+        _build_background_corpus()
+    except Exception as e:
+        logger.error(f"Could not rebuild the keyphrase background: {str(e)}")
+    finally:
+        _rebuild_lock.release()
+
+
+def get_background_corpus(ttl: float = KEYPHRASE_BACKGROUND_TTL) -> BackgroundCorpus:
+    """
+    The current background corpus, without waiting. Once it is older than
+    `ttl` seconds (or was never built) a rebuild starts in a daemon thread,
+    and the old copy is served until the new one is swapped in.
+    """
+    corpus, built_at = _background
+    if (built_at is None or time.monotonic() - built_at > ttl) and _rebuild_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, name="keyphrase-background", daemon=True).start()
+    return corpus
+
+
+class KeyphraseModel:
+    """
+    Sparse TF-IDF over one author's processed essays (sublinear term frequency,
+    L2-normalized rows), scored against a background corpus.
+    """
+
+    def __init__(self, documents: List[str], background: Optional[BackgroundCorpus] = None, author: Optional[str] = None):
+        background = background or BackgroundCorpus({}, 0)
+        self.tokens = [document.split() for document in documents]
+        self.vocabulary: Dict[str, int] = {}
+        rows, columns, counts = [], [], []
+        for row, tokens in enumerate(self.tokens):
+            for term, count in Counter(phrase_terms(tokens)).items():
+                rows.append(row)
+                columns.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+        self.terms = list(self.vocabulary)
+
+        shape = (len(documents), len(self.terms))
+        term_counts = sparse.csr_matrix((np.array(counts, dtype=float), (rows, columns)), shape=shape)
+        self.doc_freq = np.bincount(columns, minlength=len(self.terms)).astype(float)
+        self.total_counts = np.asarray(term_counts.sum(axis=0)).ravel()
+
+        weights = term_counts.copy()
+        weights.data = 1 + np.log(weights.data)
+        weights = weights @ sparse.diags(background.idf(self.terms, self.doc_freq, len(documents), author))
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        self.weights = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ weights
+        self.weights = self.weights.tocsr()
+
+        # A two-word phrase seen once is as likely to be an accident of stopword removal as a theme
+        self.is_phrase = np.fromiter((" " in term for term in self.terms), dtype=bool, count=len(self.terms))
+        self.usable = ~(self.is_phrase & (self.total_counts < 2))
+
+    def top_phrases(self, n: int) -> List[str]:
+        """
+        The author's top keyphrases: mean TF-IDF across essays, weighted towards
+        phrases that recur in many of them.
+        """
+        if not self.terms:
+            return []
+        spread = np.sqrt(self.doc_freq / len(self.tokens))
+        scores = np.asarray(self.weights.mean(axis=0)).ravel() * spread
+        return self._select(np.where(self.usable, scores, 0), n)
+
+    def essay_phrases(self, index: int, n: int) -> List[str]:
+        scores = np.zeros(len(self.terms))
+        row = self.weights.getrow(index)
+        scores[row.indices] = row.data
+        return self._select(np.where(self.usable, scores, 0), n)
+
+    def _select(self, scores: "np.ndarray", n: int) -> List[str]:
+        # Highest first, skipping terms whose words all appear in phrases already chosen.
+        # A phrase scoring at least PHRASE_SUBSUME_RATIO of a chosen word it contains takes its place.
+        chosen: List[int] = []
+        covered = set()
+        for index in np.argsort(-scores, kind="stable")[:SELECT_CANDIDATES_PER_THEME * max(n, 1)]:
+            if scores[index] <= 0:
+                break
+            words = self.terms[index].split()
+            if all(word in covered for word in words):
+                continue
+            subsumed = [
+                position for position, existing in enumerate(chosen)
+                if self.terms[existing] in words and scores[index] >= PHRASE_SUBSUME_RATIO * scores[existing]
+            ]
+            if subsumed:
+                chosen[subsumed[0]] = index
+                chosen = [existing for position, existing in enumerate(chosen) if position not in subsumed[1:]]
+            elif len(chosen) < n:
+                chosen.append(index)
+            else:
+                continue
+            if len(words) > 1:
+                covered.update(words)
+        return [self.terms[index] for index in chosen]
+
+    def condense(self, index: int, max_words: int, window: int = CONDENSE_WINDOW) -> str:
+        """
+        The essay cut down to its highest-scoring passages of `window` words,
+        kept in their original order, up to `max_words` words.
+        """
+        tokens = self.tokens[index]
+        if len(tokens) <= max_words:
+            return " ".join(tokens)
+        row = self.weights.getrow(index)
+        term_weights = np.zeros(len(self.terms))
+        term_weights[row.indices] = row.data
+        token_weights = term_weights[[self.vocabulary[token] for token in tokens]]
+        starts = np.arange(0, len(tokens), window)
+        passage_scores = np.add.reduceat(token_weights, starts)
+        keep = np.sort(np.argsort(-passage_scores, kind="stable")[:max(1, max_words // window)])
+        return " ".join(" ".join(tokens[starts[passage]:starts[passage] + window]) for passage in keep)
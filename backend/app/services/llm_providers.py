@@ -0,0 +1,351 @@
+# backend/app/services/llm_providers.py
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_CHAT_MODEL,
+    LLM_HEDGE_DELAY,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_OUTPUT_TOKENS,
+    LLM_PROVIDERS,
+    LLM_REQUESTS_PER_MINUTE,
+    OPENAI_API_KEY,
+    OPENAI_CHAT_MODEL,
+)
+from app.core.lazy_imports import lazy_import
+
+openai = lazy_import("openai")
+anthropic = lazy_import("anthropic")
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+MIN_HEDGE_DELAY = 1.0
+FAILURE_COOLDOWN = 30.0
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `requests_per_minute` with bursts of up to a tenth of that.
+    """
+
+    def __init__(self, requests_per_minute: int):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ChatProvider(ABC):
+    """
+    One chat-completion vendor with its own connection pool, concurrency cap
+    and request rate limit. Tracks recent latencies for the router: whole
+    completions in `latencies`, time to first token of streams in
+    `first_token_latencies`, so long streams do not skew hedging.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str, max_concurrency: int = LLM_MAX_CONCURRENCY, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.first_token_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.failed_at = 0.0
+        self._semaphore = None
+        self._client = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(60.0, connect=5.0))
+
+    def _slot(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def latency_quantile(self, quantile: float, streamed: bool = False) -> Optional[float]:
+        latencies = self.first_token_latencies if streamed else self.latencies
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def record_success(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def record_failure(self):
+        self.failed_at = time.monotonic()
+
+    def is_cooling_down(self) -> bool:
+        return time.monotonic() - self.failed_at < FAILURE_COOLDOWN
+
+    async def complete(self, system: str, user: str, temperature: float = 0.1) -> str:
+        async with self._slot():
+            await self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                result = await self._complete(system, user, temperature)
+            except Exception:
+                self.record_failure()
+                raise
+            self.record_success(time.monotonic() - started)
+            return result
+
+    async def stream(self, system: str, user: str, temperature: float = 0.1) -> AsyncIterator[str]:
+        async with self._slot():
+            await self.rate_limiter.acquire()
+            started = time.monotonic()
+            first_token = None
+            try:
+                async for delta in self._stream(system, user, temperature):
+                    if first_token is None:
+                        first_token = time.monotonic() - started
+                    yield delta
+            except Exception:
+                self.record_failure()
+                raise
+            self.first_token_latencies.append(first_token if first_token is not None else time.monotonic() - started)
+
+    @abstractmethod
+    async def _complete(self, system: str, user: str, temperature: float) -> str:
+        ...
+
+    @abstractmethod
+    def _stream(self, system: str, user: str, temperature: float) -> AsyncIterator[str]:
+        ...
+
+
+class OpenAIChatProvider(ChatProvider):
+    name = "openai"
+
+    def __init__(self, model: str = OPENAI_CHAT_MODEL, **kwargs):
+        super().__init__(model, **kwargs)
+
+    def client(self):
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=self._http_client())
+        return self._client
+
+    async def _complete(self, system: str, user: str, temperature: float) -> str:
+        response = await self.client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user}
+            ],
+            temperature=temperature
+        )
+        if not response or not response.choices:
+            raise ValueError("No choices returned in OpenAI response")
+        return response.choices[0].message.content or ""
+
+    async def _stream(self, system: str, user: str, temperature: float) -> AsyncIterator[str]:
+        stream = await self.client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user}
+            ],
+            temperature=temperature,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class AnthropicChatProvider(ChatProvider):
+    name = "anthropic"
+
+    def __init__(self, model: str = ANTHROPIC_CHAT_MODEL, **kwargs):
+        super().__init__(model, **kwargs)
+
+    def client(self):
+        if self._client is None:
+            self._client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, http_client=self._http_client())
+        return self._client
+
+    async def _complete(self, system: str, user: str, temperature: float) -> str:
+        response = await self.client().messages.create(
+            model=self.model,
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            system=system,
+            messages=[{"role": "user", "content": user}],
+            temperature=temperature
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    async def _stream(self, system: str, user: str, temperature: float) -> AsyncIterator[str]:
+        async with self.client().messages.stream(
+            model=self.model,
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            system=system,
+            messages=[{"role": "user", "content": user}],
+            temperature=temperature
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+
+PROVIDER_CLASSES = {
+    "openai": OpenAIChatProvider,
+    "anthropic": AnthropicChatProvider,
+}
+
+
+class LLMRouter:
+    """
+    Sends each request to the fastest healthy provider. If it has not answered
+    within that provider's p95 latency, the next provider is fired as a hedge
+    and the first successful answer wins; errors fail over to the next provider.
+    Streams are ranked and hedged the same way on time to first token; once
+    one provider has produced a token the others are cancelled.
+    """
+
+    def __init__(self, providers: List[ChatProvider], default_hedge_delay: float = LLM_HEDGE_DELAY, hedge_quantile: float = 0.95):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+        self.default_hedge_delay = default_hedge_delay
+        self.hedge_quantile = hedge_quantile
+
+    def ordered_providers(self, streamed: bool = False) -> List[ChatProvider]:
+        def rank(provider: ChatProvider):
+            median = provider.latency_quantile(0.5, streamed)
+            return (provider.is_cooling_down(), median if median is not None else float("inf"))
+        # sorted is stable, so configured order breaks ties
+        return sorted(self.providers, key=rank)
+
+    def hedge_delay(self, provider: ChatProvider, streamed: bool = False) -> float:
+        p95 = provider.latency_quantile(self.hedge_quantile, streamed)
+        return max(MIN_HEDGE_DELAY, p95) if p95 is not None else self.default_hedge_delay
+
+    async def complete(self, system: str, user: str, temperature: float = 0.1) -> str:
+        candidates = self.ordered_providers()
+        pending: Dict[asyncio.Task, ChatProvider] = {}
+        last_error: Optional[Exception] = None
+
+        def launch():
+            provider = candidates.pop(0)
+            pending[asyncio.create_task(provider.complete(system, user, temperature))] = provider
+            return provider
+
+        current = launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(current) if candidates else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"{current.name} slower than its p95, hedging with {candidates[0].name}")
+                    current = launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM provider {provider.name} failed: {last_error.__class__.__name__}: {str(last_error)}")
+                if not pending and candidates:
+                    current = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    async def stream(self, system: str, user: str, temperature: float = 0.1) -> AsyncIterator[str]:
+        candidates = self.ordered_providers(streamed=True)
+        pending: Dict[asyncio.Task, Tuple[ChatProvider, AsyncIterator[str]]] = {}
+        unused: List[AsyncIterator[str]] = []
+        winner: Optional[AsyncIterator[str]] = None
+        first: Optional[str] = None
+        last_error: Optional[Exception] = None
+
+        def launch():
+            provider = candidates.pop(0)
+            deltas = provider.stream(system, user, temperature)
+            pending[asyncio.create_task(_first_delta(deltas))] = (provider, deltas)
+            return provider
+
+        current = launch()
+        try:
+            while pending and winner is None:
+                timeout = self.hedge_delay(current, streamed=True) if candidates else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"{current.name} slower than its p95 time to first token, hedging with {candidates[0].name}")
+                    current = launch()
+                    continue
+                for task in done:
+                    provider, deltas = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"LLM provider {provider.name} failed before streaming: {last_error.__class__.__name__}: {str(last_error)}")
+                    elif winner is None:
+                        winner, first = deltas, task.result()
+                    else:
+                        unused.append(deltas)
+                if winner is None and not pending and candidates:
+                    current = launch()
+        finally:
+            # The losing streams: stop waiting on them, then close them so their slots are freed
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for deltas in unused + [deltas for _, deltas in pending.values()]:
+                await deltas.aclose()
+        if winner is None:
+            raise last_error
+
+        try:
+            if first is not None:
+                yield first
+                async for delta in winner:
+                    yield delta
+        finally:
+            await winner.aclose()
+
+
+async def _first_delta(deltas: AsyncIterator[str]) -> Optional[str]:
+    # None for a stream that ends without producing anything
+    try:
+        return await deltas.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+_router: Optional[LLMRouter] = None
+
+
+def get_router() -> LLMRouter:
+    global _router
+    if _router is None:
+        unknown = [name for name in LLM_PROVIDERS if name not in PROVIDER_CLASSES]
+        if unknown:
+            raise ValueError(f"Unsupported LLM provider: {', '.join(unknown)}")
+        _router = LLMRouter([PROVIDER_CLASSES[name]() for name in LLM_PROVIDERS])
+    return _router
@@ -1,14 +1,31 @@
 # llm_service.py
 
-from openai import AsyncOpenAI
-from app.core.config import LLM_PROVIDER, OPENAI_API_KEY
+from app.core.lazy_imports import lazy_import
+from app.core.config import COMBINE_TOKEN_BUDGET, COMBINE_BATCH_FANOUT
+from app.core.singleflight import SingleFlight, input_key
+from app.services.llm_providers import get_router
 import logging
 import json
 import re
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Optional
+
+tiktoken = lazy_import("tiktoken")
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 logger = logging.getLogger(__name__)
 
+COMBINE_MAX_DEPTH = 4
+COMBINE_CACHE_SIZE = 1024
+
+EXTRACT_SYSTEM_PROMPT = "You are an AI model tasked with extracting the main concepts, ideas, and arguments from a text. Identify and summarize the 3 most important concepts or ideas presented in the text. Focus solely on the content and avoid commenting on writing style or structure."
+COMBINE_SYSTEM_PROMPT = "You are an AI model that is trained to detect consistencies in ideas. Analyze the given concepts from multiple essays and synthesize them into 3 overarching trends in the type of ideas discussed. In this process, synthesize with the intent of comparing the ideas to traditional ideas or knowledge and finding the major differences in the ideas. Format your response as a JSON object with a 'key_themes' array containing these 3 overarching trends."
+
+_encoding = None
+_inflight_calls = SingleFlight()
+_combine_cache: "OrderedDict[str, dict]" = OrderedDict()
+
 def parse_llm_response(response_text: str) -> dict:
     """
     Parse the LLM response, handling potential JSON formatting issues.
@@ -20,79 +37,205 @@ def parse_llm_response(response_text: str) -> dict:
     except json.JSONDecodeError:
         # If JSON parsing fails, attempt to extract key themes manually
         themes = re.findall(r'"theme":\s*"([^"]*)"', clean_text)
-        return {"key_themes": themes if themes else []}
+        return {"key_themes": [{"theme": theme} for theme in themes]}
+
+class PartialThemeParser:
+    """
+    Incrementally pulls completed elements out of a streamed
+    {"key_themes": [...]} JSON document.
+    """
 
-async def extract_concepts(text: str) -> dict:
-    if LLM_PROVIDER != "openai":
-        raise ValueError(f"Unsupported LLM provider: {LLM_PROVIDER}")
+    def __init__(self):
+        self.buffer = ""
+        self.position = None
+        self.finished = False
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        if self.position is None:
+            match = re.search(r'"key_themes"\s*:\s*\[', self.buffer)
+            if not match:
+                return []
+            self.position = match.end()
+
+        items = []
+        while not self.finished:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n,":
+                self.position += 1
+            if self.position >= len(self.buffer):
+                break
+            if self.buffer[self.position] == "]":
+                self.finished = True
+                break
+            try:
+                item, self.position = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                break  # element not complete yet
+            items.append(item)
+        return items
+
+async def stream_completion(system: str, user: str) -> AsyncIterator[str]:
+    async for delta in get_router().stream(system, user, temperature=0.1):
+        yield delta
+
+async def stream_concepts(text: str) -> AsyncIterator[str]:
+    """
+    Yield the lines of extract_concepts' answer as each one completes.
+    """
+    buffer = ""
+    async for delta in stream_completion(EXTRACT_SYSTEM_PROMPT, text):
+        buffer += delta
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    yield buffer
+
+async def extract_concepts(text: str, on_theme: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Extract the main concepts from an essay. When `on_theme` is given the
+    completion is streamed and each non-empty line is passed to it as it arrives.
+    Identical texts already in flight share that call (and only its first caller
+    receives streamed lines).
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    return await _inflight_calls.do(input_key("extract", text), lambda: _extract_concepts(text, on_theme))
 
+async def _extract_concepts(text: str, on_theme: Optional[Callable[[str], None]] = None) -> dict:
     try:
-        if not isinstance(text, str):
-            text = str(text)
-        
         logger.info(f"Extracting concepts for text: {text[:100]}...")  # Log first 100 chars
 
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an AI model tasked with extracting the main concepts, ideas, and arguments from a text. Identify and summarize the 3 most important concepts or ideas presented in the text. Focus solely on the content and avoid commenting on writing style or structure."},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.1
-        )
-
-        logger.info(f"Raw OpenAI API response: {response}")
-
-        if response and response.choices and len(response.choices) > 0:
-            result = response.choices[0].message.content
-            logger.info(f"Raw LLM result: {result}")
-            return {"insights": {"key_themes": result.split('\n')}}
-        else:
-            logger.error("No choices returned in response.")
-            return {"insights": {"key_themes": []}}
+        if on_theme is not None:
+            lines = []
+            async for line in stream_concepts(text):
+                lines.append(line)
+                if line.strip():
+                    on_theme(line)
+            logger.info(f"Streamed LLM result: {lines}")
+            return {"insights": {"key_themes": lines}}
+
+        result = await get_router().complete(EXTRACT_SYSTEM_PROMPT, text, temperature=0.1)
+        logger.info(f"Raw LLM result: {result}")
+        return {"insights": {"key_themes": result.split('\n')}}
 
     except Exception as e:
         logger.error(f"Error in extract_concepts: {e.__class__.__name__}: {str(e)}")
         logger.exception("Full traceback:")
         return {"insights": {"key_themes": []}}
 
-def parse_llm_response(response_text: str) -> dict:
-    # Remove code block markers if present
-    clean_text = re.sub(r'```json\s*|\s*```', '', response_text)
-    try:
-        return json.loads(clean_text)
-    except json.JSONDecodeError:
-        # If JSON parsing fails, attempt to extract key themes manually
-        themes = re.findall(r'"theme":\s*"([^"]*)"', clean_text)
-        return {"key_themes": [{"theme": theme} for theme in themes]}
+def load_token_encoding():
+    """
+    Load the tokenizer count_tokens uses. tiktoken downloads it on first use,
+    so preflight calls this from a worker thread rather than leaving it to the
+    first request on the event loop.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o family tokenizer
+        except Exception as e:
+            # Offline: fall back to ~4 characters per token
+            logger.warning(f"Could not load tiktoken encoding, estimating token counts: {str(e)}")
+            _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = load_token_encoding()
+    if encoding is False:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _theme_text(theme) -> str:
+    if isinstance(theme, dict):
+        return ": ".join(str(value) for value in theme.values())
+    return str(theme)
+
+def format_concepts(all_concepts: list, label: str = "Essay") -> str:
+    return "\n".join([f"{label} {i+1}:\n" + "\n".join(_theme_text(theme) for theme in concepts) for i, concepts in enumerate(all_concepts)])
+
+def _is_batch_boundary(concepts: list) -> bool:
+    # Content-defined boundaries keep batches stable when essays are added or reordered
+    digest = hashlib.sha1("\n".join(_theme_text(theme) for theme in concepts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % COMBINE_BATCH_FANOUT == 0
+
+def plan_combine_batches(all_concepts: list, token_budget: int = None) -> list:
+    token_budget = token_budget or COMBINE_TOKEN_BUDGET
+    batches, current, current_tokens = [], [], 0
+    for concepts in all_concepts:
+        tokens = count_tokens(format_concepts([concepts]))
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(concepts)
+        current_tokens += tokens
+        if _is_batch_boundary(concepts):
+            batches.append(current)
+            current, current_tokens = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+async def _combine_batch_cached(batch: list, label: str) -> dict:
+    key = hashlib.sha1(format_concepts(batch, label).encode("utf-8")).hexdigest()
+    if key in _combine_cache:
+        _combine_cache.move_to_end(key)
+        return _combine_cache[key]
+    result = await _combine_once(batch, label)
+    if result.get("key_themes"):
+        _combine_cache[key] = result
+        while len(_combine_cache) > COMBINE_CACHE_SIZE:
+            _combine_cache.popitem(last=False)
+    return result
+
+async def combine_concepts(all_concepts: list, on_theme: Optional[Callable[[object], None]] = None, _level: int = 0) -> dict:
+    """
+    Synthesize per-essay themes into overall themes. Archives too large for one
+    prompt are tree-reduced: token-budgeted batches are combined concurrently and
+    their summaries combined again, with batch results cached between calls.
+    Only the final combine is streamed to `on_theme`.
+    """
+    label = "Essay" if _level == 0 else "Theme group"
+    if _level >= COMBINE_MAX_DEPTH or count_tokens(format_concepts(all_concepts, label)) <= COMBINE_TOKEN_BUDGET:
+        return await _combine_once(all_concepts, label, on_theme)
+
+    batches = plan_combine_batches(all_concepts)
+    if len(batches) == 1:
+        return await _combine_once(all_concepts, label, on_theme)
+
+    logger.info(f"Tree-combining {len(all_concepts)} items in {len(batches)} batches at level {_level}")
+    batch_results = await asyncio.gather(*(_combine_batch_cached(batch, label) for batch in batches))
+    summaries = [[_theme_text(theme) for theme in result.get("key_themes", [])] for result in batch_results]
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        return {"key_themes": []}
+    return await combine_concepts(summaries, on_theme, _level + 1)
+
+async def _combine_once(all_concepts: list, label: str = "Essay", on_theme: Optional[Callable[[object], None]] = None) -> dict:
+    combined_text = format_concepts(all_concepts, label)
+    return await _inflight_calls.do(input_key("combine", combined_text), lambda: _request_combined_concepts(all_concepts, combined_text, on_theme))
 
-async def combine_concepts(all_concepts: list) -> dict:
-    combined_text = "\n".join([f"Essay {i+1}:\n" + "\n".join(essay) for i, essay in enumerate(all_concepts)])
-    
+async def _request_combined_concepts(all_concepts: list, combined_text: str, on_theme: Optional[Callable[[object], None]] = None) -> dict:
     logger.info(f"Combining concepts from {len(all_concepts)} essays")
     logger.info(f"Combined text: {combined_text}")
 
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an AI model that is trained to detect consistencies in ideas. Analyze the given concepts from multiple essays and synthesize them into 3 overarching trends in the type of ideas discussed. In this process, synthesize with the intent of comparing the ideas to traditional ideas or knowledge and finding the major differences in the ideas. Format your response as a JSON object with a 'key_themes' array containing these 3 overarching trends."},
-                {"role": "user", "content": combined_text}
-            ],
-            temperature=0.1
-        )
-
-        logger.info(f"Raw OpenAI API response for combined concepts: {response}")
-
-        if response and response.choices and len(response.choices) > 0:
-            result = response.choices[0].message.content
-            logger.info(f"Raw LLM result for combined concepts: {result}")
-            parsed_result = parse_llm_response(result)
-            logger.info(f"Parsed insights for combined concepts: {parsed_result}")
-            return parsed_result
-        else:
-            logger.error("No choices returned in response for combined concepts.")
-            return {"key_themes": []}
+        if on_theme is not None:
+            parser = PartialThemeParser()
+            chunks = []
+            async for delta in stream_completion(COMBINE_SYSTEM_PROMPT, combined_text):
+                chunks.append(delta)
+                for theme in parser.feed(delta):
+                    on_theme(theme)
+            result = "".join(chunks)
+            logger.info(f"Streamed LLM result for combined concepts: {result}")
+            return parse_llm_response(result)
+
+        result = await get_router().complete(COMBINE_SYSTEM_PROMPT, combined_text, temperature=0.1)
+        logger.info(f"Raw LLM result for combined concepts: {result}")
+        parsed_result = parse_llm_response(result)
+        logger.info(f"Parsed insights for combined concepts: {parsed_result}")
+        return parsed_result
 
     except Exception as e:
         logger.error(f"Error in combine_concepts: {e.__class__.__name__}: {str(e)}")
@@ -0,0 +1,184 @@
+# backend/app/services/local_embeddings.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from app.core.config import (
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_BATCH_WAIT_MS,
+    LOCAL_EMBEDDING_MAX_TOKENS,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_MODEL_DIR,
+    LOCAL_EMBEDDING_THREADS,
+)
+from app.core.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+ort = lazy_import("onnxruntime")
+tokenizers = lazy_import("tokenizers")
+huggingface_hub = lazy_import("huggingface_hub")
+
+logger = logging.getLogger(__name__)
+
+MAX_DEFAULT_THREADS = 4
+
+
+def default_thread_count() -> int:
+    # Leave headroom for the event loop and the scraper threads rather than claiming every core
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    return max(1, min(MAX_DEFAULT_THREADS, available))
+
+
+def _model_files(model_dir: Optional[str], model_name: str) -> Tuple[str, str]:
+    if model_dir:
+        onnx_path = os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(onnx_path):
+            onnx_path = os.path.join(model_dir, "onnx", "model.onnx")
+        return onnx_path, os.path.join(model_dir, "tokenizer.json")
+    # Sentence-transformers repositories ship an ONNX export next to the tokenizer
+    return (
+        huggingface_hub.hf_hub_download(model_name, "onnx/model.onnx"),
+        huggingface_hub.hf_hub_download(model_name, "tokenizer.json"),
+    )
+
+
+class LocalEmbeddingModel:
+    """
+    A sentence-embedding model run on CPU with ONNX Runtime: mean pooling over
+    the last hidden state, then L2 normalization. Not thread-safe to construct;
+    use get_local_model() so each worker process loads it once.
+    """
+
+    def __init__(self, model_dir: Optional[str] = LOCAL_EMBEDDING_MODEL_DIR, model_name: str = LOCAL_EMBEDDING_MODEL, threads: int = LOCAL_EMBEDDING_THREADS, max_tokens: int = LOCAL_EMBEDDING_MAX_TOKENS):
+        onnx_path, tokenizer_path = _model_files(model_dir, model_name)
+        self.threads = threads or default_thread_count()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options)
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = tokenizers.Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        # Pad to the longest text in each batch, not to max_tokens
+        self.tokenizer.enable_padding()
+        logger.info(f"Loaded local embedding model from {onnx_path} with {self.threads} threads")
+
+    @property
+    def dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+_model: Optional[LocalEmbeddingModel] = None
+_model_lock = threading.Lock()
+
+
+def get_local_model() -> LocalEmbeddingModel:
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = LocalEmbeddingModel()
+    return _model
+
+
+class BatchingEmbedder:
+    """
+    Collects embedding requests from concurrent callers into batches of up to
+    `batch_size`, waiting at most `max_wait` seconds for a batch to fill. Each
+    batch runs in a worker thread so inference never blocks the event loop, and
+    only one batch runs at a time so ONNX Runtime's own threads are not
+    oversubscribed.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], "np.ndarray"], batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE, max_wait: float = LOCAL_EMBEDDING_BATCH_WAIT_MS / 1000):
+        self.embed_batch = embed_batch
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.embedded = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._queue, self._worker = loop, asyncio.Queue(), None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> List[float]:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _run(self):
+        # Exits once the queue drains; the next embed() call starts a new worker
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait()]
+            deadline = self._loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self.embed_batch, texts)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(batch)} texts")
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.embedded += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector.tolist())
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "embedded": self.embedded,
+            "avg_batch_size": round(self.embedded / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_embedder: Optional[BatchingEmbedder] = None
+
+
+def get_local_embedder() -> BatchingEmbedder:
+    global _embedder
+    if _embedder is None:
+        # The model loads on the first batch, inside the worker thread
+        _embedder = BatchingEmbedder(lambda texts: get_local_model().embed_batch(texts))
+    return _embedder
@@ -0,0 +1,268 @@
+# backend/app/services/refresh_service.py
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import (
+    LLM_MAX_OUTPUT_TOKENS,
+    REFRESH_DAILY_TOKEN_BUDGET,
+    REFRESH_INTERVAL,
+    REFRESH_OFFPEAK_HOURS,
+    TRACKED_AUTHORS,
+    TRACKED_AUTHORS_FILE,
+)
+from app.core.lazy_imports import lazy_import
+from app.services.llm_service import COMBINE_SYSTEM_PROMPT, EXTRACT_SYSTEM_PROMPT, count_tokens
+from app.utils.analysis_store import load_analysis, mark_analysis_checked
+from app.utils.crawl_scheduler import BACKGROUND, crawl_scheduler
+from app.utils.scraper import MAX_POSTS, clean_html_content, feed_url_for, standardize_url
+
+feedparser = lazy_import("feedparser")
+
+logger = logging.getLogger(__name__)
+
+REFRESH_STATE_FILE = os.path.join("output", "refresh_state.json")
+
+_tracked_authors: Optional[List[str]] = None
+
+
+def load_tracked_authors(path: str = TRACKED_AUTHORS_FILE) -> List[str]:
+    """
+    Canonical author URLs from TRACKED_AUTHORS plus one URL per line of `path`
+    (blank lines and '#' comments ignored). Unsupported URLs are skipped.
+    """
+    urls = list(TRACKED_AUTHORS)
+    if os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+    authors = []
+    for url in urls:
+        try:
+            author_url = standardize_url(url)[1]
+        except ValueError:
+            logger.warning(f"Ignoring unsupported tracked author URL: {url}")
+            continue
+        if author_url not in authors:
+            authors.append(author_url)
+    return authors
+
+
+def tracked_authors() -> List[str]:
+    global _tracked_authors
+    if _tracked_authors is None:
+        _tracked_authors = load_tracked_authors()
+    return _tracked_authors
+
+
+def tracked_author_url(url: str) -> Optional[str]:
+    """
+    The canonical author URL for `url` if that author is tracked, else None.
+    """
+    try:
+        author_url = standardize_url(url)[1]
+    except ValueError:
+        return None
+    return author_url if author_url in tracked_authors() else None
+
+
+def parse_hour_window(window: str) -> Tuple[int, int]:
+    start, end = (int(hour) % 24 for hour in window.split("-", 1))
+    return start, end
+
+
+def in_hour_window(hour: int, window: Tuple[int, int]) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= hour < end
+    # Windows such as 22-5 wrap past midnight
+    return hour >= start or hour < end
+
+
+def estimate_analysis_tokens(texts: List[str]) -> int:
+    """
+    Upper bound on the LLM tokens a full analysis of `texts` costs: one extract
+    call per essay plus one combine call, each allowed a full-length answer.
+    Raw feed text is counted, which overstates what the preprocessed text sends.
+    """
+    if not texts:
+        return 0
+    extract_prompt = count_tokens(EXTRACT_SYSTEM_PROMPT)
+    extract_tokens = sum(extract_prompt + count_tokens(text) + LLM_MAX_OUTPUT_TOKENS for text in texts)
+    combine_tokens = count_tokens(COMBINE_SYSTEM_PROMPT) + (len(texts) + 1) * LLM_MAX_OUTPUT_TOKENS
+    return extract_tokens + combine_tokens
+
+
+class FeedCheck:
+    __slots__ = ("changed", "fetched", "etag", "last_modified", "links", "texts")
+
+    def __init__(self, changed: bool, fetched: bool = False, etag: Optional[str] = None, last_modified: Optional[str] = None, links: Optional[List[str]] = None, texts: Optional[List[str]] = None):
+        self.changed = changed
+        # False when the feed could not be asked at all (robots.txt), so nothing was learned
+        self.fetched = fetched
+        self.etag = etag
+        self.last_modified = last_modified
+        self.links = links or []
+        self.texts = texts or []
+
+
+class RefreshDaemon:
+    """
+    Keeps stored analyses of tracked authors fresh. Every cycle each author's
+    feed is polled with a conditional request; authors with new posts are
+    re-analyzed at background crawl priority, but only inside the off-peak
+    window and while the day's LLM token budget lasts. Feed validators are
+    only committed once an analysis succeeds, so skipped authors are retried;
+    feeds without new posts have theirs updated and their stored analysis
+    marked as checked.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[[str], Awaitable[dict]],
+        authors: Optional[List[str]] = None,
+        interval: float = REFRESH_INTERVAL,
+        offpeak_hours: str = REFRESH_OFFPEAK_HOURS,
+        daily_token_budget: int = REFRESH_DAILY_TOKEN_BUDGET,
+        state_file: str = REFRESH_STATE_FILE,
+    ):
+        self.analyze = analyze
+        self.authors = authors if authors is not None else tracked_authors()
+        self.interval = interval
+        self.offpeak_window = parse_hour_window(offpeak_hours)
+        self.daily_token_budget = daily_token_budget
+        self.state_file = state_file
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Starting with empty refresh state, could not read {self.state_file}: {str(e)}")
+            state = {}
+        state.setdefault("authors", {})
+        state.setdefault("budget", {"date": "", "spent": 0})
+        return state
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_file)
+
+    def remaining_budget(self, now: datetime) -> int:
+        budget = self.state["budget"]
+        today = now.date().isoformat()
+        if budget["date"] != today:
+            budget["date"], budget["spent"] = today, 0
+        return self.daily_token_budget - budget["spent"]
+
+    async def check_feed(self, author_url: str) -> FeedCheck:
+        author_state = self.state["authors"].get(author_url, {})
+        headers = {}
+        # Without a stored analysis there is nothing to keep, so ask for the full feed
+        if load_analysis(author_url) is not None:
+            if author_state.get("etag"):
+                headers["If-None-Match"] = author_state["etag"]
+            if author_state.get("last_modified"):
+                headers["If-Modified-Since"] = author_state["last_modified"]
+
+        feed_url = feed_url_for(author_url)
+        if not await crawl_scheduler.allowed(feed_url, BACKGROUND):
+            logger.warning(f"robots.txt disallows fetching {feed_url}")
+            return FeedCheck(changed=False)
+        await crawl_scheduler.acquire(feed_url, BACKGROUND)
+        async with httpx.AsyncClient(follow_redirects=True) as client:
+            response = await client.get(feed_url, headers=headers)
+        if response.status_code == 304:
+            return FeedCheck(
+                changed=False,
+                fetched=True,
+                etag=response.headers.get("etag", author_state.get("etag")),
+                last_modified=response.headers.get("last-modified", author_state.get("last_modified")),
+                links=author_state.get("links", []),
+            )
+        response.raise_for_status()
+
+        feed = feedparser.parse(response.text)
+        entries = feed.entries[:MAX_POSTS]
+        links = [entry.get("link", "") for entry in entries]
+        changed = not headers or set(links) != set(author_state.get("links", []))
+        texts = []
+        if changed:
+            for entry in entries:
+                content = entry.content[0].value if "content" in entry else entry.get("summary", "")
+                texts.append(clean_html_content(content))
+        return FeedCheck(
+            changed=changed,
+            fetched=True,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            links=links,
+            texts=texts,
+        )
+
+    async def refresh_author(self, author_url: str, offpeak: bool, now: datetime) -> str:
+        check = await self.check_feed(author_url)
+        if not check.changed:
+            if check.fetched:
+                # New validators for the same posts, or the feed would be downloaded in full every cycle
+                self._remember_feed(author_url, check)
+                self._save_state()
+                mark_analysis_checked(author_url)
+            return "unchanged"
+        if not offpeak:
+            logger.info(f"New posts for {author_url}; deferring analysis to the off-peak window")
+            return "deferred"
+        estimate = estimate_analysis_tokens(check.texts)
+        remaining = self.remaining_budget(now)
+        if estimate > remaining:
+            logger.info(f"Skipping {author_url}: needs ~{estimate} tokens, {remaining} left in today's budget")
+            return "over_budget"
+
+        status = await self.analyze(author_url)
+        self.state["budget"]["spent"] += estimate
+        if status.get("status") != "completed":
+            logger.warning(f"Refresh of {author_url} failed: {status.get('message', 'unknown error')}")
+            self._save_state()
+            return "failed"
+        self._remember_feed(author_url, check)
+        self._save_state()
+        return "refreshed"
+
+    def _remember_feed(self, author_url: str, check: FeedCheck):
+        self.state["authors"][author_url] = {
+            "etag": check.etag,
+            "last_modified": check.last_modified,
+            "links": check.links,
+        }
+
+    async def refresh_once(self, now: Optional[datetime] = None) -> Dict[str, str]:
+        now = now or datetime.now(timezone.utc)
+        offpeak = in_hour_window(now.hour, self.offpeak_window)
+        outcomes = {}
+        for author_url in self.authors:
+            try:
+                outcomes[author_url] = await self.refresh_author(author_url, offpeak, now)
+            except Exception as e:
+                logger.error(f"Error refreshing {author_url}: {str(e)}")
+                outcomes[author_url] = "failed"
+        logger.info(f"Refresh cycle finished: {outcomes}")
+        return outcomes
+
+    async def run_forever(self):
+        logger.info(f"Refreshing {len(self.authors)} tracked authors every {self.interval:.0f}s")
+        while True:
+            await self.refresh_once()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,107 @@
+# backend/app/services/stylometry.py
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import List
+
+from app.core.lazy_imports import lazy_import
+from app.models.records import EssayInsights
+
+np = lazy_import("numpy")
+
+SENTIMENT_LABELS = ("positive", "neutral", "negative")
+
+# MTLD bands, checked against essays from the recorded loadtest feed (105-200) and plain blog prose (50-60)
+PLAIN_VOCABULARY_MTLD = 70
+VARIED_VOCABULARY_MTLD = 120
+
+
+def describe_style(readability: float, mean_sentence_length: float, vocabulary_richness: float, sentiment_score: float) -> str:
+    """
+    One-line description of an author's style from their aggregate metrics.
+    Readability bands follow the Flesch reading-ease scale; vocabulary
+    richness is MTLD (see text_processor.mtld).
+    """
+    if readability >= 70:
+        register = "Accessible"
+    elif readability >= 50:
+        register = "Conversational but considered"
+    elif readability >= 30:
+        register = "Dense, analytical"
+    else:
+        register = "Academic"
+
+    if mean_sentence_length < 14:
+        sentences = "short, punchy sentences"
+    elif mean_sentence_length > 24:
+        sentences = "long, layered sentences"
+    else:
+        sentences = "medium-length sentences"
+
+    if vocabulary_richness >= VARIED_VOCABULARY_MTLD:
+        vocabulary = "a varied vocabulary"
+    elif vocabulary_richness < PLAIN_VOCABULARY_MTLD:
+        vocabulary = "a plain vocabulary"
+    else:
+        vocabulary = "an everyday vocabulary"
+
+    if sentiment_score > 0.3:
+        tone = "an upbeat tone"
+    elif sentiment_score < -0.3:
+        tone = "a critical tone"
+    else:
+        tone = "a measured tone"
+
+    return f"{register} prose with {sentences}, {vocabulary} and {tone}"
+
+
+def aggregate_style(essays: List[EssayInsights]) -> dict:
+    """
+    Per-author stylometry from the essays' local measurements. Readability,
+    sentiment and vocabulary are averaged weighted by essay length; sentence
+    length statistics are pooled over every sentence of every essay.
+    """
+    if not essays:
+        return {
+            "readability_score": 0,
+            "sentiment": "Unknown",
+            "sentiment_distribution": {label: 0.0 for label in SENTIMENT_LABELS},
+            "writing_style": "Not available",
+            "style_metrics": {},
+        }
+
+    words = np.array([max(essay.word_count, 1) for essay in essays], dtype=float)
+    sentences = np.array([max(essay.sentence_count, 1) for essay in essays], dtype=float)
+    readability = np.array([essay.readability_score for essay in essays], dtype=float)
+    compound = np.array([essay.sentiment_score for essay in essays], dtype=float)
+    richness = np.array([essay.vocabulary_richness for essay in essays], dtype=float)
+    sentence_means = np.array([essay.mean_sentence_length for essay in essays], dtype=float)
+    sentence_stds = np.array([essay.sentence_length_std for essay in essays], dtype=float)
+
+    avg_readability = float(np.average(readability, weights=words))
+    avg_compound = float(np.average(compound, weights=words))
+    avg_richness = float(np.average(richness, weights=words))
+    pooled_mean = float(np.average(sentence_means, weights=sentences))
+    # Combine per-essay variances with the spread of the essay means around the pooled mean
+    pooled_std = float(np.sqrt(np.average(sentence_stds ** 2 + (sentence_means - pooled_mean) ** 2, weights=sentences)))
+
+    counts = Counter(essay.sentiment for essay in essays)
+    distribution = {label: round(counts.get(label, 0) / len(essays), 3) for label in SENTIMENT_LABELS}
+    # Ties go to the label first in SENTIMENT_LABELS order
+    dominant = max(SENTIMENT_LABELS, key=lambda label: counts.get(label, 0))
+
+    return {
+        "readability_score": round(avg_readability, 1),
+        "sentiment": dominant.capitalize(),
+        "sentiment_distribution": distribution,
+        "writing_style": describe_style(avg_readability, pooled_mean, avg_richness, avg_compound),
+        "style_metrics": {
+            "sentiment_score": round(avg_compound, 3),
+            "mean_sentence_length": round(pooled_mean, 1),
+            "sentence_length_std": round(pooled_std, 1),
+            "vocabulary_richness": round(avg_richness, 2),
+            "readability_spread": round(float(readability.std()), 1),
+            "total_words": int(words.sum()),
+        },
+    }
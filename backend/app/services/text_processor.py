@@ -1,43 +1,102 @@
 # text_processor.py
 
 import re
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
-from textstat import flesch_reading_ease
+import importlib
+from app.core.lazy_imports import lazy_import
+from app.core.preflight import ensure_nltk_resources
+from app.models.records import ProcessedText
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('vader_lexicon')
+nltk = lazy_import("nltk")
+np = lazy_import("numpy")
+textstat = lazy_import("textstat")
+
+_WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+
+MTLD_THRESHOLD = 0.72
+
+_stop_words = None
+_sentiment_analyzer = None
+
+def _load_models():
+    global _stop_words, _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        ensure_nltk_resources()
+        _stop_words = set(nltk.corpus.stopwords.words('english'))
+        _sentiment_analyzer = importlib.import_module("nltk.sentiment").SentimentIntensityAnalyzer()
+    return _stop_words, _sentiment_analyzer
+
+def content_tokens(text: str) -> list:
+    """
+    The tokens process_text keeps in processed_text, without the sentence and
+    sentiment work; used for background document frequencies.
+    """
+    stop_words, _ = _load_models()
+    return [word for word in re.sub(r'[^a-zA-Z\s]', '', text).lower().split() if word not in stop_words]
+
+def _mtld_pass(words: list) -> float:
+    # Count the stretches of text over which the type-token ratio stays above the threshold
+    factors = 0.0
+    types = set()
+    tokens = 0
+    for word in words:
+        types.add(word)
+        tokens += 1
+        if len(types) / tokens <= MTLD_THRESHOLD:
+            factors += 1
+            types.clear()
+            tokens = 0
+    if tokens:
+        factors += (1 - len(types) / tokens) / (1 - MTLD_THRESHOLD)
+    return len(words) / factors if factors else float(len(words))
+
+def mtld(words: list) -> float:
+    """
+    Measure of textual lexical diversity (McCarthy and Jarvis, 2010): the mean
+    length of word runs whose type-token ratio stays above MTLD_THRESHOLD,
+    averaged over a forward and a backward pass. Unlike type-token ratios it
+    does not drift with essay length.
+    """
+    if not words:
+        return 0.0
+    return (_mtld_pass(words) + _mtld_pass(words[::-1])) / 2
+
+def process_text(text: str) -> ProcessedText:
+    stop_words, sia = _load_models()
 
-def process_text(text: str) -> dict:
     # Remove special characters and digits
     clean_text = re.sub(r'[^a-zA-Z\s]', '', text)
-    
+
     # Convert to lowercase
     clean_text = clean_text.lower()
-    
+
     # Tokenize into sentences and words
-    sentences = sent_tokenize(text)
-    words = word_tokenize(clean_text)
-    
+    sentences = nltk.sent_tokenize(text)
+    words = nltk.word_tokenize(clean_text)
+
     # Remove stopwords
-    stop_words = set(stopwords.words('english'))
     filtered_words = [word for word in words if word not in stop_words]
-    
+
     # Calculate readability score
-    readability_score = flesch_reading_ease(text)
-    
+    readability_score = textstat.flesch_reading_ease(text)
+
+    # Sentence-length and vocabulary statistics for the stylometry stage
+    sentence_lengths = np.fromiter((len(_WORD.findall(sentence)) for sentence in sentences), dtype=float, count=len(sentences))
+    if not len(sentence_lengths):
+        sentence_lengths = np.zeros(1)
+    vocabulary_richness = mtld(words)
+
     # Perform sentiment analysis
-    sia = SentimentIntensityAnalyzer()
     sentiment_scores = sia.polarity_scores(text)
     sentiment = 'positive' if sentiment_scores['compound'] > 0 else 'negative' if sentiment_scores['compound'] < 0 else 'neutral'
-    
-    return {
-        'processed_text': ' '.join(filtered_words),
-        'sentence_count': len(sentences),
-        'word_count': len(words),
-        'readability_score': readability_score,
-        'sentiment': sentiment
-    }
\ No newline at end of file
+
+    return ProcessedText(
+        processed_text=' '.join(filtered_words),
+        sentence_count=len(sentences),
+        word_count=len(words),
+        readability_score=readability_score,
+        sentiment=sentiment,
+        sentiment_score=sentiment_scores['compound'],
+        mean_sentence_length=float(sentence_lengths.mean()),
+        sentence_length_std=float(sentence_lengths.std()),
+        vocabulary_richness=vocabulary_richness
+    )
@@ -0,0 +1,93 @@
+# backend/app/utils/analysis_store.py
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.models.records import EssayInsights, pack_records, unpack_records
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_DIR_NAME = os.path.join("output", "analyses")
+
+
+def _analysis_path(author_url: str, root: str, extension: str = "json") -> str:
+    return os.path.join(root, f"{hashlib.sha1(author_url.encode('utf-8')).hexdigest()}.{extension}")
+
+
+def _write_atomically(path: str, data: bytes):
+    # Write then rename so a reader never sees a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_analysis(author_url: str, result: dict, result_id: str, essays: Optional[List[EssayInsights]] = None, root: str = ANALYSIS_DIR_NAME) -> str:
+    """
+    Store the latest completed analysis for an author, replacing any earlier one.
+    Per-essay insights, when given, are packed alongside so a later refresh only
+    sends new essays to the LLM.
+    """
+    os.makedirs(root, exist_ok=True)
+    path = _analysis_path(author_url, root)
+    record = {
+        "author_url": author_url,
+        "result_id": result_id,
+        "stored_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+        "result": result,
+    }
+    if essays is not None:
+        _write_atomically(_analysis_path(author_url, root, "essays"), pack_records(essays))
+    _write_atomically(path, json.dumps(record).encode("utf-8"))
+    logger.info(f"Stored analysis {result_id} for {author_url} in {path}")
+    return path
+
+
+def load_analysis(author_url: str, root: str = ANALYSIS_DIR_NAME) -> Optional[dict]:
+    path = _analysis_path(author_url, root)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable stored analysis {path}: {str(e)}")
+        return None
+
+
+def mark_analysis_checked(author_url: str, root: str = ANALYSIS_DIR_NAME) -> bool:
+    """
+    Record that the author's feed was checked and the stored analysis is still
+    current. Returns False when there is no stored analysis.
+    """
+    record = load_analysis(author_url, root)
+    if record is None:
+        return False
+    record["checked_at"] = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    _write_atomically(_analysis_path(author_url, root), json.dumps(record).encode("utf-8"))
+    return True
+
+
+def analysis_age(record: dict, now: Optional[datetime] = None) -> float:
+    """
+    Seconds since the stored analysis was produced or last confirmed current.
+    """
+    now = now or datetime.now(timezone.utc)
+    confirmed = datetime.fromisoformat(record.get("checked_at") or record["stored_at"])
+    return (now - confirmed).total_seconds()
+
+
+def load_essay_insights(author_url: str, root: str = ANALYSIS_DIR_NAME) -> List[EssayInsights]:
+    path = _analysis_path(author_url, root, "essays")
+    try:
+        with open(path, "rb") as f:
+            return unpack_records(EssayInsights, f.read())
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, EOFError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable stored essays {path}: {str(e)}")
+        return []
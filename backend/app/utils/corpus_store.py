@@ -0,0 +1,139 @@
+# backend/app/utils/corpus_store.py
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.core.lazy_imports import lazy_import
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR_NAME = os.path.join("output", "corpus")
+
+POST_COLUMNS = ['title', 'subtitle', 'url', 'content', 'date', 'like_count']
+
+CORPUS_COLUMNS = POST_COLUMNS + ['content_hash', 'scraped_at']
+
+# Dedupe-then-write must not interleave for one author, or both writers store the same posts
+_author_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_author_locks_guard = threading.Lock()
+
+
+def corpus_schema() -> pa.Schema:
+    return pa.schema(
+        [(name, pa.string()) for name in POST_COLUMNS + ['content_hash']]
+        + [('scraped_at', pa.timestamp('s'))]
+    )
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _unescape(value: str) -> str:
+    # clean_content doubles quotes for the CSV writer; Parquet stores strings verbatim
+    return value.replace('""', '"')
+
+
+def _author_dir(author: str, root: str) -> str:
+    return os.path.join(root, f"author={author}")
+
+
+def _partition_files(author: str, root: str) -> List[str]:
+    author_dir = _author_dir(author, root)
+    if not os.path.isdir(author_dir):
+        return []
+    return sorted(
+        os.path.join(author_dir, name)
+        for name in os.listdir(author_dir)
+        if name.endswith('.parquet')
+    )
+
+
+def list_authors(root: str = CORPUS_DIR_NAME) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name.split('=', 1)[1]
+        for name in os.listdir(root)
+        if name.startswith('author=') and _partition_files(name.split('=', 1)[1], root)
+    )
+
+
+def _known_keys(author: str, root: str) -> Set[str]:
+    # Only the two key columns are read, so large partitions stay cheap to dedupe against
+    keys: Set[str] = set()
+    for path in _partition_files(author, root):
+        table = pq.read_table(path, columns=['url', 'content_hash'], memory_map=True)
+        keys.update(table.column('url').to_pylist())
+        keys.update(table.column('content_hash').to_pylist())
+    return keys
+
+
+def save_posts(posts: Iterable[Dict[str, str]], author: str, root: str = CORPUS_DIR_NAME) -> Optional[str]:
+    """
+    Append posts to the author's partition, skipping any whose URL or content
+    hash is already stored. Returns the path of the new part file, if any.
+    Safe to call from several threads at once.
+    """
+    with _author_locks_guard:
+        lock = _author_locks[os.path.join(root, author)]
+    with lock:
+        return _save_new_posts(posts, author, root)
+
+
+def _save_new_posts(posts: Iterable[Dict[str, str]], author: str, root: str) -> Optional[str]:
+    known = _known_keys(author, root)
+    scraped_at = datetime.now().replace(microsecond=0)
+
+    rows = {name: [] for name in CORPUS_COLUMNS}
+    for post in posts:
+        content = _unescape(post.get('content', ''))
+        digest = content_hash(content)
+        url = post.get('url', '')
+        if url in known or digest in known:
+            continue
+        known.update((url, digest))
+        for column in POST_COLUMNS:
+            rows[column].append(content if column == 'content' else _unescape(str(post.get(column, ''))))
+        rows['content_hash'].append(digest)
+        rows['scraped_at'].append(scraped_at)
+
+    if not rows['url']:
+        logger.info(f"No new posts to store for {author}")
+        return None
+
+    author_dir = _author_dir(author, root)
+    os.makedirs(author_dir, exist_ok=True)
+    filename = f"part-{scraped_at.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:12]}.parquet"
+    filepath = os.path.join(author_dir, filename)
+    # Written under a hidden name and renamed, so readers never map a half-written part
+    tmp_path = os.path.join(author_dir, f".{filename}.tmp")
+    table = pa.Table.from_pydict(rows, schema=corpus_schema())
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, filepath)
+    logger.info(f"Stored {table.num_rows} new posts for {author} in {filepath}")
+    return filepath
+
+
+def read_posts(author: str, columns: Optional[List[str]] = None, root: str = CORPUS_DIR_NAME) -> pd.DataFrame:
+    """
+    Read an author's stored posts. Pass `columns` to project only what is
+    needed (e.g. ['content']); part files are memory-mapped rather than copied.
+    """
+    files = _partition_files(author, root)
+    if not files:
+        return pd.DataFrame(columns=columns or CORPUS_COLUMNS)
+    tables = [pq.read_table(path, columns=columns, memory_map=True) for path in files]
+    return pa.concat_tables(tables).to_pandas()
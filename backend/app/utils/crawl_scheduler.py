@@ -0,0 +1,242 @@
+# backend/app/utils/crawl_scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from app.core.config import CRAWL_BURST, CRAWL_REQUESTS_PER_SECOND, ROBOTS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 10
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+ROBOTS_USER_AGENT = "*"
+ROBOTS_ERROR_TTL = 300
+
+
+def domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that hands out reservations: a caller always gets
+    a token and is told how long to wait before using it.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class _DomainQueue:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.dispatcher: Optional[asyncio.Task] = None
+
+
+class _WaitStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class CrawlScheduler:
+    """
+    Shared politeness layer for every outbound scrape. Requests to the same
+    domain draw from one token bucket; async callers queue by priority
+    (INTERACTIVE before BACKGROUND), while blocking callers such as
+    BaseSubstackScraper take the next reservation in line. robots.txt is
+    fetched once per domain and cached.
+    """
+
+    def __init__(self, rate: float = CRAWL_REQUESTS_PER_SECOND, burst: float = CRAWL_BURST, robots_ttl: float = ROBOTS_CACHE_TTL):
+        self.rate = rate
+        self.burst = burst
+        self.robots_ttl = robots_ttl
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, _DomainQueue] = {}
+        self._robots: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+        self._wait_stats: Dict[Tuple[str, int], _WaitStats] = defaultdict(_WaitStats)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(self.rate, self.burst)
+            return self._buckets[domain]
+
+    def _queue(self, domain: str) -> _DomainQueue:
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(domain)
+        if queue is None or queue.loop is not loop:
+            queue = self._queues[domain] = _DomainQueue(loop)
+        return queue
+
+    def _record_wait(self, domain: str, priority: int, seconds: float):
+        with self._lock:
+            self._wait_stats[(domain, priority)].add(seconds)
+
+    async def acquire(self, url: str, priority: int = INTERACTIVE):
+        """
+        Wait until a request to `url`'s domain may be sent.
+        """
+        domain = domain_of(url)
+        queue = self._queue(domain)
+        future = queue.loop.create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(queue.waiters, (priority, next(self._sequence), future))
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = queue.loop.create_task(self._dispatch(domain, queue))
+        await future
+        self._record_wait(domain, priority, time.monotonic() - enqueued)
+
+    async def _dispatch(self, domain: str, queue: _DomainQueue):
+        bucket = self._bucket(domain)
+        while queue.waiters:
+            delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Pop after sleeping so interactive requests that arrived meanwhile go first
+            while queue.waiters:
+                _, _, future = heapq.heappop(queue.waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                bucket.refund()
+
+    def acquire_blocking(self, url: str, priority: int = BACKGROUND):
+        """
+        Blocking variant for synchronous scrapers; sleeps the calling thread.
+        """
+        domain = domain_of(url)
+        delay = self._bucket(domain).reserve()
+        if delay > 0:
+            time.sleep(delay)
+        self._record_wait(domain, priority, delay)
+
+    def _cached_robots(self, root: str) -> Tuple[bool, Optional[RobotFileParser]]:
+        entry = self._robots.get(root)
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def _store_robots(self, root: str, status_code: Optional[int], text: str) -> Optional[RobotFileParser]:
+        # RFC 9309: a missing robots.txt (4xx) allows everything, while a server
+        # error or no answer means the site is struggling, so disallow everything.
+        # Either way, look again sooner.
+        if status_code is not None and 400 <= status_code < 500:
+            self._robots[root] = (time.monotonic() + ROBOTS_ERROR_TTL, None)
+            return None
+        if status_code is None or status_code >= 500:
+            parser = RobotFileParser()
+            parser.disallow_all = True
+            self._robots[root] = (time.monotonic() + ROBOTS_ERROR_TTL, parser)
+            return parser
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        self._robots[root] = (time.monotonic() + self.robots_ttl, parser)
+        return parser
+
+    async def robots(self, url: str, priority: int = INTERACTIVE) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        root = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        cached, parser = self._cached_robots(root)
+        if cached:
+            return parser
+        robots_url = f"{root}/robots.txt"
+        await self.acquire(robots_url, priority)
+        try:
+            async with httpx.AsyncClient(follow_redirects=True) as client:
+                response = await client.get(robots_url)
+            return self._store_robots(root, response.status_code, response.text)
+        except Exception as e:
+            logger.warning(f"Could not fetch {robots_url}: {str(e)}")
+            return self._store_robots(root, None, "")
+
+    def robots_blocking(self, url: str, priority: int = BACKGROUND) -> Optional[RobotFileParser]:
+        parsed = urlparse(url)
+        root = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        cached, parser = self._cached_robots(root)
+        if cached:
+            return parser
+        robots_url = f"{root}/robots.txt"
+        self.acquire_blocking(robots_url, priority)
+        try:
+            with httpx.Client(follow_redirects=True) as client:
+                response = client.get(robots_url)
+            return self._store_robots(root, response.status_code, response.text)
+        except Exception as e:
+            logger.warning(f"Could not fetch {robots_url}: {str(e)}")
+            return self._store_robots(root, None, "")
+
+    async def allowed(self, url: str, priority: int = INTERACTIVE) -> bool:
+        parser = await self.robots(url, priority)
+        return parser is None or parser.can_fetch(ROBOTS_USER_AGENT, url)
+
+    def allowed_blocking(self, url: str, priority: int = BACKGROUND) -> bool:
+        parser = self.robots_blocking(url, priority)
+        return parser is None or parser.can_fetch(ROBOTS_USER_AGENT, url)
+
+    def sitemaps_blocking(self, url: str) -> List[str]:
+        """
+        Sitemaps advertised in the domain's robots.txt, falling back to /sitemap.xml.
+        """
+        parser = self.robots_blocking(url)
+        advertised = parser.site_maps() if parser is not None else None
+        if advertised:
+            return advertised
+        parsed = urlparse(url)
+        return [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            waits = {}
+            for (domain, priority), stats in self._wait_stats.items():
+                waits.setdefault(domain, {})[PRIORITY_NAMES.get(priority, str(priority))] = {
+                    "requests": stats.count,
+                    "avg_wait_seconds": round(stats.total / stats.count, 3) if stats.count else 0.0,
+                    "max_wait_seconds": round(stats.max, 3),
+                }
+            queued = {domain: len(queue.waiters) for domain, queue in self._queues.items() if queue.waiters}
+        return {"queue_wait": waits, "queued": queued}
+
+
+crawl_scheduler = CrawlScheduler()
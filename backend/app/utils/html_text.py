@@ -0,0 +1,270 @@
+# backend/app/utils/html_text.py
+
+from html.parser import HTMLParser
+from typing import Callable, Dict, List
+import logging
+
+from app.core.config import HTML_TEXT_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# BeautifulSoup does not treat the contents of these tags as text
+SKIPPED_TAGS = {"script", "style", "template"}
+
+
+class TextExtractor(HTMLParser):
+    """
+    Collects text nodes in a single pass without building a tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.chunks.append(data)
+
+
+class _LxmlTextTarget:
+    # lxml reports entity references as separate data events, so consecutive
+    # events are merged back into one text node before tag boundaries
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.pending: List[str] = []
+        self.skip_depth = 0
+
+    def _flush(self):
+        if self.pending:
+            self.chunks.append(''.join(self.pending))
+            self.pending = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def close(self):
+        self._flush()
+        return self.chunks
+
+
+def _collapse(chunks: List[str]) -> str:
+    # Equivalent to get_text(separator=' ', strip=True) followed by clean_content's \s+ collapse
+    return ' '.join(' '.join(chunks).split())
+
+
+def _stdlib_text(html: str) -> str:
+    parser = TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return _collapse(parser.chunks)
+
+
+def _lxml_text(html: str) -> str:
+    from lxml import etree
+    parser = etree.HTMLParser(target=_LxmlTextTarget())
+    parser.feed(html)
+    return _collapse(parser.close())
+
+
+def _bs4_text(html: str) -> str:
+    from bs4 import BeautifulSoup
+    return _collapse([BeautifulSoup(html, 'html.parser').get_text(separator=' ', strip=True)])
+
+
+BACKENDS: Dict[str, Callable[[str], str]] = {
+    "stdlib": _stdlib_text,
+    "lxml": _lxml_text,
+    "bs4": _bs4_text,
+}
+
+
+def _resolve_backend(name: str) -> Callable[[str], str]:
+    if name == "auto":
+        try:
+            import lxml  # noqa: F401
+            return _lxml_text
+        except ImportError:
+            return _stdlib_text
+    if name not in BACKENDS:
+        raise ValueError(f"Unsupported HTML text backend: {name}")
+    return BACKENDS[name]
+
+
+_default_backend = _resolve_backend(HTML_TEXT_BACKEND)
+
+
+def extract_text(html: str, backend: str = None) -> str:
+    """
+    Return the visible text of an HTML fragment with whitespace collapsed.
+    """
+    extractor = _resolve_backend(backend) if backend else _default_backend
+    return extractor(html)
+
+
+# Tags BeautifulSoup's html.parser builder treats as self-closing
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+    "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+    "image", "isindex", "nextid", "spacer",
+}
+
+DATE_CONTAINER_CLASSES = {"pencraft", "pc-display-flex", "pc-gap-4", "pc-reset"}
+
+POST_FIELDS = ("title", "subtitle", "date", "like_count", "content")
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _OpenElement:
+    __slots__ = ("tag", "is_date_container", "is_ufi_button", "captures")
+
+    def __init__(self, tag: str, is_date_container: bool, is_ufi_button: bool):
+        self.tag = tag
+        self.is_date_container = is_date_container
+        self.is_ufi_button = is_ufi_button
+        self.captures: List[str] = []
+
+
+class PostPageExtractor(HTMLParser):
+    """
+    Single-pass equivalent of the selectors BaseSubstackScraper used on a full soup:
+
+        title       h1.post-title, h2
+        subtitle    h3.subtitle
+        date        .pencraft.pc-display-flex.pc-gap-4.pc-reset .pencraft
+        like_count  a.post-ufi-button .label
+        content     div.available-content
+
+    Only the text under the first match of each selector is kept, and parsing
+    stops as soon as every field has been closed.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[_OpenElement] = []
+        self.active: Dict[str, List[str]] = {}
+        self.results: Dict[str, str] = {}
+        self.date_containers = 0
+        self.ufi_buttons = 0
+        self.skip_depth = 0
+
+    def _matches(self, tag: str, classes: set) -> List[str]:
+        matched = []
+        if tag == "h2" or (tag == "h1" and "post-title" in classes):
+            matched.append("title")
+        if tag == "h3" and "subtitle" in classes:
+            matched.append("subtitle")
+        if self.date_containers and "pencraft" in classes:
+            matched.append("date")
+        if self.ufi_buttons and "label" in classes:
+            matched.append("like_count")
+        if tag == "div" and "available-content" in classes:
+            matched.append("content")
+        return [field for field in matched if field not in self.results and field not in self.active]
+
+    def handle_starttag(self, tag, attrs):
+        classes = set((dict(attrs).get("class") or "").split())
+        fields = self._matches(tag, classes)
+        if tag in VOID_TAGS:
+            for field in fields:
+                self.results[field] = ""
+            self._check_done()
+            return
+
+        element = _OpenElement(
+            tag,
+            DATE_CONTAINER_CLASSES <= classes,
+            tag == "a" and "post-ufi-button" in classes,
+        )
+        for field in fields:
+            self.active[field] = []
+            element.captures.append(field)
+        self.date_containers += element.is_date_container
+        self.ufi_buttons += element.is_ufi_button
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            self._pop()
+        self._check_done()
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        for chunks in self.active.values():
+            chunks.append(data)
+
+    def _pop(self):
+        element = self.stack.pop()
+        self.date_containers -= element.is_date_container
+        self.ufi_buttons -= element.is_ufi_button
+        if element.tag in SKIPPED_TAGS:
+            self.skip_depth -= 1
+        for field in element.captures:
+            self._finish(field)
+
+    def _finish(self, field: str):
+        chunks = self.active.pop(field)
+        if field == "content":
+            # get_text(separator=' ', strip=True)
+            self.results[field] = ' '.join(chunk.strip() for chunk in chunks if chunk.strip())
+        else:
+            # .text.strip()
+            self.results[field] = ''.join(chunks).strip()
+
+    def _check_done(self):
+        if len(self.results) == len(POST_FIELDS):
+            raise _StopParsing()
+
+    def close(self):
+        super().close()
+        for field in list(self.active):
+            self._finish(field)
+
+
+def extract_post_fields(html: str) -> Dict[str, str]:
+    """
+    Return the text of each field in POST_FIELDS that was found on a Substack
+    post page; missing fields are absent from the result.
+    """
+    parser = PostPageExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except _StopParsing:
+        pass
+    return parser.results
@@ -1,24 +1,38 @@
 # backend/app/utils/scraper.py
 
+from __future__ import annotations
+
 import httpx
-from bs4 import BeautifulSoup
-import feedparser
 from urllib.parse import urljoin, urlparse, urlparse, urlunparse
 import asyncio
-from typing import List, Dict, Optional
-import pandas as pd
+from typing import IO, Callable, Iterator, List, Dict, Optional, Tuple
 import csv
+import gzip
+import heapq
 import os
 import logging
+import queue
+import threading
 import xml.etree.ElementTree as ET
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from tqdm import tqdm
 import json
 import re
+from app.core.config import SITEMAP_FETCH_CONCURRENCY
+from app.core.lazy_imports import lazy_import
+from app.models.records import Post, parse_date
+from app.utils.corpus_store import save_posts
+from app.utils.crawl_scheduler import BACKGROUND, INTERACTIVE, crawl_scheduler
+from app.utils.html_text import extract_post_fields, extract_text
 
 MAX_POSTS = 4
 BASE_DIR_NAME = "output"
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+feedparser = lazy_import("feedparser")
+pd = lazy_import("pandas")
+requests = lazy_import("requests")
+tqdm = lazy_import("tqdm")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,36 +48,147 @@ def clean_content(content: str) -> str:
     content = content.replace('"', '""')
     return content
 
+def clean_html_content(html: str) -> str:
+    # extract_text already collapses whitespace, so only the quote escaping is left to do
+    return extract_text(html).replace('"', '""')
+
+def iter_sitemap(stream: IO[bytes]) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    """
+    Incrementally parse a sitemap or sitemap index, yielding ("url" | "sitemap",
+    loc, lastmod) as each entry closes. Parsed entries are cleared from the tree
+    so memory stays flat however large the file is.
+    """
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+    for event, element in context:
+        if event != "end" or element.tag not in (f"{SITEMAP_NS}url", f"{SITEMAP_NS}sitemap"):
+            continue
+        loc = (element.findtext(f"{SITEMAP_NS}loc") or "").strip()
+        if loc:
+            yield element.tag[len(SITEMAP_NS):], loc, parse_date(element.findtext(f"{SITEMAP_NS}lastmod"))
+        root.clear()
+
 class BaseSubstackScraper:
-    def __init__(self, base_substack_url: str, save_dir: str):
+    def __init__(self, base_substack_url: str, save_dir: str, priority: int = BACKGROUND):
         if not base_substack_url.endswith("/"):
             base_substack_url += "/"
         self.base_substack_url: str = base_substack_url
+        self.priority: int = priority
         self.writer_name: str = extract_main_part(base_substack_url)
         self.save_dir: str = save_dir
         os.makedirs(self.save_dir, exist_ok=True)
         self.keywords: List[str] = ["about", "archive", "podcast"]
-        self.post_urls: List[str] = self.get_all_post_urls()
+        # lastmod of every post URL seen in the sitemaps; pass it to a later scrape_posts as known_lastmod
+        self.lastmod: Dict[str, Optional[datetime]] = {}
+
+    def iter_post_urls(self) -> Iterator[str]:
+        """
+        Post URLs as the sitemaps are parsed, falling back to the feed when the
+        sitemaps yield nothing.
+        """
+        found = False
+        for url in self.iter_urls_from_sitemap():
+            found = True
+            yield url
+        if not found:
+            yield from self.filter_urls(self.fetch_urls_from_feed(), self.keywords)
 
     def get_all_post_urls(self) -> List[str]:
-        urls = self.fetch_urls_from_sitemap()
-        if not urls:
-            urls = self.fetch_urls_from_feed()
-        return self.filter_urls(urls, self.keywords)
-
-    def fetch_urls_from_sitemap(self) -> List[str]:
-        sitemap_url = f"{self.base_substack_url}sitemap.xml"
-        response = requests.get(sitemap_url)
-        if not response.ok:
-            logger.error(f'Error fetching sitemap at {sitemap_url}: {response.status_code}')
-            return []
-        root = ET.fromstring(response.content)
-        return [element.text for element in root.iter('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')]
+        return list(self.iter_post_urls())
+
+    def polite_get(self, url: str, stream: bool = False) -> Optional[requests.Response]:
+        if not crawl_scheduler.allowed_blocking(url, self.priority):
+            logger.warning(f"robots.txt disallows fetching {url}")
+            return None
+        crawl_scheduler.acquire_blocking(url, self.priority)
+        return requests.get(url, stream=stream)
+
+    def _parse_sitemap(self, sitemap_url: str, emit: Callable[[Tuple[str, str, Optional[datetime]]], bool]):
+        response = self.polite_get(sitemap_url, stream=True)
+        if response is None or not response.ok:
+            logger.error(f'Error fetching sitemap at {sitemap_url}: {response.status_code if response is not None else "disallowed"}')
+            return
+        try:
+            # Undo Content-Encoding on the raw stream; .xml.gz files are gzipped on top of that
+            response.raw.decode_content = True
+            stream = gzip.GzipFile(fileobj=response.raw) if urlparse(sitemap_url).path.endswith(".gz") else response.raw
+            for entry in iter_sitemap(stream):
+                if not emit(entry):
+                    return
+        except (ET.ParseError, OSError) as e:
+            logger.error(f"Error parsing sitemap at {sitemap_url}: {str(e)}")
+        finally:
+            response.close()
+
+    def iter_urls_from_sitemap(self) -> Iterator[str]:
+        """
+        Stream post URLs out of the site's sitemaps. Nested sitemap indexes are
+        fetched concurrently (every request still goes through the crawl
+        scheduler), URLs matching `keywords` are dropped while parsing, and each
+        URL is yielded as soon as it is read. Closing the iterator early stops
+        the remaining fetches.
+        """
+        entries: queue.Queue = queue.Queue(maxsize=1000)
+        stop = threading.Event()
+        finished = object()
+
+        def emit(entry) -> bool:
+            # Bounded queue: parsing runs at most 1000 entries ahead of the consumer
+            while not stop.is_set():
+                try:
+                    entries.put(entry, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def parse(sitemap_url: str):
+            try:
+                self._parse_sitemap(sitemap_url, emit)
+            except Exception as e:
+                logger.error(f"Error fetching sitemap at {sitemap_url}: {str(e)}")
+            finally:
+                # Queued after every entry of this sitemap, so nested indexes are submitted before it is counted
+                emit(finished)
+
+        seen = set()
+        yielded = set()
+        outstanding = 0
+        executor = ThreadPoolExecutor(max_workers=SITEMAP_FETCH_CONCURRENCY, thread_name_prefix="sitemap")
+
+        def submit(sitemap_url: str):
+            nonlocal outstanding
+            if sitemap_url not in seen:
+                seen.add(sitemap_url)
+                outstanding += 1
+                executor.submit(parse, sitemap_url)
+
+        try:
+            # Sitemap locations come from the cached robots.txt when it advertises any
+            for sitemap_url in crawl_scheduler.sitemaps_blocking(self.base_substack_url):
+                submit(sitemap_url)
+            while outstanding:
+                entry = entries.get()
+                if entry is finished:
+                    outstanding -= 1
+                    continue
+                kind, loc, lastmod = entry
+                if kind == "sitemap":
+                    submit(loc)
+                elif loc not in yielded and all(keyword not in loc for keyword in self.keywords):
+                    yielded.add(loc)
+                    self.lastmod[loc] = lastmod
+                    yield loc
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def fetch_urls_from_feed(self) -> List[str]:
         logger.info('Falling back to feed.xml. This will only contain up to the 22 most recent posts.')
         feed_url = f"{self.base_substack_url}feed"
-        response = requests.get(feed_url)
+        response = self.polite_get(feed_url)
+        if response is None:
+            return []
         if not response.ok:
             logger.error(f'Error fetching feed at {feed_url}: {response.status_code}')
             return []
@@ -74,45 +199,64 @@ class BaseSubstackScraper:
     def filter_urls(urls: List[str], keywords: List[str]) -> List[str]:
         return [url for url in urls if all(keyword not in url for keyword in keywords)]
 
-    def get_url_soup(self, url: str) -> Optional[BeautifulSoup]:
+    def get_url_html(self, url: str) -> Optional[str]:
         try:
-            response = requests.get(url)
+            response = self.polite_get(url)
+            if response is None:
+                return None
             response.raise_for_status()
-            return BeautifulSoup(response.text, "html.parser")
+            return response.text
         except Exception as e:
             logger.error(f"Error fetching page {url}: {str(e)}")
             return None
 
-    def extract_post_data(self, soup: BeautifulSoup, url: str) -> Dict[str, str]:
-        title = soup.select_one("h1.post-title, h2").text.strip() if soup.select_one("h1.post-title, h2") else "No title"
-        subtitle_element = soup.select_one("h3.subtitle")
-        subtitle = subtitle_element.text.strip() if subtitle_element else ""
-        date_element = soup.select_one(".pencraft.pc-display-flex.pc-gap-4.pc-reset .pencraft")
-        date = date_element.text.strip() if date_element else "Date not available"
-        like_count_element = soup.select_one("a.post-ufi-button .label")
-        like_count = like_count_element.text.strip() if like_count_element else "Like count not available"
-        content_element = soup.select_one("div.available-content")
-        content = content_element.get_text(separator=' ', strip=True) if content_element else "No content"
-        content = clean_content(content)
+    def extract_post_data(self, html: str, url: str) -> Post:
+        fields = extract_post_fields(html)
+        title = fields.get("title", "No title")
+        subtitle = fields.get("subtitle", "")
+        date = fields.get("date", "Date not available")
+        like_count = fields.get("like_count", "Like count not available")
+        content = clean_content(fields.get("content", "No content"))
         
-        return {
-            "title": clean_content(title),
-            "subtitle": clean_content(subtitle),
-            "url": url,
-            "content": content,
-            "date": clean_content(date),
-            "like_count": clean_content(like_count)
-        }
-
-    def scrape_posts(self, num_posts_to_scrape: int = 0) -> List[Dict[str, str]]:
+        return Post.from_strings(
+            title=clean_content(title),
+            subtitle=clean_content(subtitle),
+            url=url,
+            content=content,
+            date=clean_content(date),
+            like_count=clean_content(like_count)
+        )
+
+    def _recency(self, url: str) -> Tuple[bool, float]:
+        # URLs without a lastmod (feed fallback) rank last, keeping their order
+        lastmod = self.lastmod.get(url)
+        return (lastmod is not None, lastmod.timestamp() if lastmod is not None else 0.0)
+
+    def is_changed(self, url: str, known_lastmod: Dict[str, Optional[datetime]]) -> bool:
+        if url not in known_lastmod:
+            return True
+        known, current = known_lastmod[url], self.lastmod.get(url)
+        return known is None or current is None or current.timestamp() > known.timestamp()
+
+    def scrape_posts(self, num_posts_to_scrape: int = 0, known_lastmod: Optional[Dict[str, Optional[datetime]]] = None) -> List[Post]:
+        """
+        Scrape the newest `num_posts_to_scrape` posts by sitemap lastmod (0: all
+        of them). Posts whose lastmod is no newer than in `known_lastmod`, the
+        `lastmod` of an earlier scrape, are unchanged and skipped.
+        """
         posts_data = []
-        total = min(num_posts_to_scrape, len(self.post_urls)) if num_posts_to_scrape != 0 else len(self.post_urls)
-        for url in tqdm(self.post_urls[:total], total=total):
+        urls = self.iter_post_urls()
+        if known_lastmod:
+            urls = (url for url in urls if self.is_changed(url, known_lastmod))
+        if num_posts_to_scrape != 0:
+            # Nested sitemaps arrive in no particular order, so every entry is read; only the newest n are kept
+            urls = heapq.nlargest(num_posts_to_scrape, urls, key=self._recency)
+        for url in tqdm.tqdm(urls, total=num_posts_to_scrape or None):
             try:
-                soup = self.get_url_soup(url)
-                if soup is None:
+                html = self.get_url_html(url)
+                if html is None:
                     continue
-                post_data = self.extract_post_data(soup, url)
+                post_data = self.extract_post_data(html, url)
                 posts_data.append(post_data)
             except Exception as e:
                 logger.error(f"Error scraping post: {e}")
@@ -120,7 +264,7 @@ class BaseSubstackScraper:
 
 from urllib.parse import urlparse
 
-async def scrape_medium(url: str) -> Dict[str, List[Dict[str, str]]]:
+async def scrape_medium(url: str, priority: int = INTERACTIVE) -> Dict[str, List[Post]]:
     parsed_url = urlparse(url)
     path_parts = parsed_url.path.strip('/').split('/')
     
@@ -137,6 +281,10 @@ async def scrape_medium(url: str) -> Dict[str, List[Dict[str, str]]]:
     logger.info(f"Fetching RSS feed from: {rss_url}")
     async with httpx.AsyncClient() as client:
         try:
+            if not await crawl_scheduler.allowed(rss_url, priority):
+                logger.warning(f"robots.txt disallows fetching {rss_url}")
+                return {'posts': []}
+            await crawl_scheduler.acquire(rss_url, priority)
             response = await client.get(rss_url)
             response.raise_for_status()
             logger.info(f"RSS feed fetched successfully. Status code: {response.status_code}")
@@ -149,27 +297,31 @@ async def scrape_medium(url: str) -> Dict[str, List[Dict[str, str]]]:
     entries = []
     for post in feed.entries[:MAX_POSTS]:
         try:
-            soup = BeautifulSoup(post.content[0].value, 'html.parser')
-            cleaned_text = clean_content(soup.get_text(separator=' ', strip=True))
-            entries.append({
-                'title': clean_content(post.title),
-                'url': post.link,
-                'content': cleaned_text,
-                'date': clean_content(post.published),
-                'subtitle': '',
-                'like_count': 'N/A'
-            })
+            cleaned_text = clean_html_content(post.content[0].value)
+            entries.append(Post.from_strings(
+                title=clean_content(post.title),
+                subtitle='',
+                url=post.link,
+                content=cleaned_text,
+                date=clean_content(post.published),
+                like_count='N/A'
+            ))
         except Exception as e:
             logger.error(f"Error processing post {post.link}: {str(e)}")
 
     logger.info(f"Scraped {len(entries)} posts from Medium")
     return {'posts': entries}
 
-async def scrape_substack(url: str) -> Dict[str, List[Dict[str, str]]]:
+async def scrape_substack(url: str, priority: int = INTERACTIVE) -> Dict[str, List[Post]]:
     logger.info(f"Fetching Substack posts from: {url}")
     async with httpx.AsyncClient(follow_redirects=True) as client:
         try:
-            response = await client.get(f"{url}feed")
+            feed_url = f"{url}feed"
+            if not await crawl_scheduler.allowed(feed_url, priority):
+                logger.warning(f"robots.txt disallows fetching {feed_url}")
+                return {'posts': []}
+            await crawl_scheduler.acquire(feed_url, priority)
+            response = await client.get(feed_url)
             response.raise_for_status()
             feed = feedparser.parse(response.text)
             logger.info(f"Number of entries in feed: {len(feed.entries)}")
@@ -186,23 +338,25 @@ async def scrape_substack(url: str) -> Dict[str, List[Dict[str, str]]]:
     for post in feed.entries[:MAX_POSTS]:
         try:
             content = post.content[0].value if 'content' in post else post.summary
-            soup = BeautifulSoup(content, 'html.parser')
-            cleaned_text = clean_content(soup.get_text(separator=' ', strip=True))
-            entries.append({
-                'title': clean_content(post.title),
-                'url': post.link,
-                'content': cleaned_text,
-                'date': clean_content(post.published),
-                'subtitle': '',
-                'like_count': 'N/A'
-            })
+            cleaned_text = clean_html_content(content)
+            entries.append(Post.from_strings(
+                title=clean_content(post.title),
+                subtitle='',
+                url=post.link,
+                content=cleaned_text,
+                date=clean_content(post.published),
+                like_count='N/A'
+            ))
         except Exception as e:
             logger.error(f"Error processing Substack post {post.link}: {str(e)}")
 
     logger.info(f"Scraped {len(entries)} posts from Substack")
     return {'posts': entries}
 
-async def scrape_url(url: str) -> Dict[str, List[Dict[str, str]]]:
+def standardize_url(url: str) -> Tuple[str, str]:
+    """
+    Return the platform ('medium' or 'substack') and canonical author URL for `url`.
+    """
     parsed_url = urlparse(url)
     
     # Handle Medium URLs
@@ -219,9 +373,7 @@ async def scrape_url(url: str) -> Dict[str, List[Dict[str, str]]]:
         username = username.lstrip('@')
         
         # Construct the standardized Medium URL
-        standardized_url = f"https://medium.com/@{username}"
-        logger.info(f"Transformed Medium URL: {standardized_url}")
-        return await scrape_medium(standardized_url)
+        return 'medium', f"https://medium.com/@{username}"
     
     # Handle Substack URLs (existing code)
     elif 'substack.com' in parsed_url.netloc or parsed_url.netloc.endswith('.com'):
@@ -233,14 +385,43 @@ async def scrape_url(url: str) -> Dict[str, List[Dict[str, str]]]:
             username = parsed_url.netloc.split('.')[0]
         
         # Standardize to username.substack.com format
-        substack_url = f"https://{username}.substack.com/"
-        logger.info(f"Transformed Substack URL: {substack_url}")
-        return await scrape_substack(substack_url)
+        return 'substack', f"https://{username}.substack.com/"
     else:
         raise ValueError(f"Unsupported URL: {url}")
 
+def feed_url_for(url: str) -> str:
+    platform, standardized_url = standardize_url(url)
+    if platform == 'medium':
+        return f"https://medium.com/feed/@{standardized_url.rsplit('@', 1)[1]}"
+    return f"{standardized_url}feed"
+
+def author_key(url: str) -> str:
+    """
+    The corpus store partition for `url`: the author's username on either platform.
+    """
+    platform, standardized_url = standardize_url(url)
+    if platform == 'medium':
+        return standardized_url.rsplit('@', 1)[1]
+    return extract_main_part(standardized_url)
 
-def save_to_csv(data: Dict[str, List[Dict[str, str]]], filename: str):
+async def scrape_url(url: str, priority: int = INTERACTIVE) -> Dict[str, List[Post]]:
+    platform, standardized_url = standardize_url(url)
+    if platform == 'medium':
+        logger.info(f"Transformed Medium URL: {standardized_url}")
+        data = await scrape_medium(standardized_url, priority)
+    else:
+        logger.info(f"Transformed Substack URL: {standardized_url}")
+        data = await scrape_substack(standardized_url, priority)
+    if data['posts']:
+        # Every scrape feeds the corpus store; a failed write must not fail the scrape
+        try:
+            await asyncio.to_thread(save_to_corpus, data, author_key(url))
+        except Exception as e:
+            logger.error(f"Error storing posts for {url}: {str(e)}")
+    return data
+
+
+def save_to_csv(data: Dict[str, List[Post]], filename: str):
     os.makedirs(BASE_DIR_NAME, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     full_filename = f"{filename}_{timestamp}.csv"
@@ -253,9 +434,15 @@ def save_to_csv(data: Dict[str, List[Dict[str, str]]], filename: str):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
         writer.writeheader()
         for post in data['posts']:
-            writer.writerow(post)
+            writer.writerow(post.to_row())
     logger.info(f"Saved {len(data['posts'])} posts to {filepath}")
     return filepath
 
-def scraper_output_to_df(data: Dict[str, List[Dict[str, str]]]) -> pd.DataFrame:
-    return pd.DataFrame(data['posts'])
\ No newline at end of file
+def save_to_corpus(data: Dict[str, List[Post]], author: str) -> Optional[str]:
+    if not data['posts']:
+        logger.warning(f"No posts to save for {author}")
+        return None
+    return save_posts((post.to_row() for post in data['posts']), author)
+
+def scraper_output_to_df(data: Dict[str, List[Post]]) -> pd.DataFrame:
+    return pd.DataFrame([post.to_row() for post in data['posts']])
\ No newline at end of file
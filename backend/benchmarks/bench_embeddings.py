@@ -0,0 +1,56 @@
+# backend/benchmarks/bench_embeddings.py
+#
+# Throughput of the local ONNX embedding backend: one text per call versus
+# concurrent callers batched by BatchingEmbedder, across thread counts.
+# Run from the backend directory: python benchmarks/bench_embeddings.py [texts] [threads,...] [batch sizes,...]
+# The model is read from LOCAL_EMBEDDING_MODEL_DIR or downloaded from LOCAL_EMBEDDING_MODEL.
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.local_embeddings import BatchingEmbedder, LocalEmbeddingModel
+
+SENTENCES = [
+    "Writers return to the same ideas again and again, with small variations.",
+    "A quoted aside that runs on for a while before it makes its point about cities and the people who live in them.",
+    "Remote work changes where people choose to live.",
+    "The essay argues that institutions decay when nobody is responsible for maintaining them, and that this decay is slow enough to go unnoticed for decades.",
+]
+
+
+def sequential(model: LocalEmbeddingModel, texts):
+    started = time.perf_counter()
+    for text in texts:
+        model.embed_batch([text])
+    return time.perf_counter() - started
+
+
+async def batched(model: LocalEmbeddingModel, texts, batch_size: int):
+    embedder = BatchingEmbedder(model.embed_batch, batch_size=batch_size, max_wait=0.005)
+    started = time.perf_counter()
+    await asyncio.gather(*(embedder.embed(text) for text in texts))
+    return time.perf_counter() - started, embedder.metrics()["avg_batch_size"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    thread_counts = [int(n) for n in (sys.argv[2] if len(sys.argv) > 2 else "1,2,4").split(",")]
+    batch_sizes = [int(n) for n in (sys.argv[3] if len(sys.argv) > 3 else "8,32,64").split(",")]
+    texts = [f"{SENTENCES[i % len(SENTENCES)]} ({i})" for i in range(count)]
+
+    for threads in thread_counts:
+        model = LocalEmbeddingModel(threads=threads)
+        model.embed_batch(texts[:8])  # warm up
+        elapsed = sequential(model, texts)
+        print(f"threads={threads}  one-by-one        {count / elapsed:8.1f} texts/s")
+        for batch_size in batch_sizes:
+            elapsed, avg_batch = asyncio.run(batched(model, texts, batch_size))
+            print(f"threads={threads}  batch<={batch_size:<3} (avg {avg_batch:5.1f}) {count / elapsed:8.1f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
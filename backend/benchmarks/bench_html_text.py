@@ -0,0 +1,37 @@
+# backend/benchmarks/bench_html_text.py
+#
+# Compare HTML-to-text backends on a synthetic large post.
+# Run from the backend directory: python benchmarks/bench_html_text.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.html_text import BACKENDS, extract_text
+
+PARAGRAPH = (
+    '<p>Writers <em>return</em> to the same <a href="https://example.com">ideas</a> '
+    'again &amp; again, with &ldquo;small&rdquo; variations.</p>\n'
+    '<blockquote><p>A quoted aside that runs on for a while.</p></blockquote>\n'
+)
+LARGE_POST = '<div class="body markup">' + PARAGRAPH * 2000 + '<script>track();</script></div>'
+
+
+def main():
+    print(f"Post size: {len(LARGE_POST) / 1024:.0f} KiB")
+    baseline = extract_text(LARGE_POST, backend="bs4")
+    for name in BACKENDS:
+        try:
+            output = extract_text(LARGE_POST, backend=name)
+        except ImportError:
+            print(f"{name:>7}: not installed")
+            continue
+        runs = 5
+        seconds = timeit.timeit(lambda: extract_text(LARGE_POST, backend=name), number=runs) / runs
+        print(f"{name:>7}: {seconds * 1000:8.1f} ms/post  identical={output == baseline}")
+
+
+if __name__ == "__main__":
+    main()
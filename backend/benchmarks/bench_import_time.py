@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_import_time.py
+#
+# Profile cold-start cost of importing the API process.
+# Run from the backend directory: python benchmarks/bench_import_time.py [module] [runs]
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def import_once(module: str):
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return elapsed, completed.stderr
+
+
+def top_level_imports(importtime_output: str, limit: int = 15):
+    # Lines look like: "import time:   self [us] |  cumulative | imported package"
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        if "." not in name.strip():
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "main"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    timings, output = [], ""
+    for _ in range(runs):
+        elapsed, output = import_once(module)
+        timings.append(elapsed)
+
+    print(f"import {module}: median {statistics.median(timings) * 1000:.0f} ms over {runs} cold runs "
+          f"(min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms)")
+    print("Heaviest top-level packages (cumulative):")
+    for cumulative_us, name in top_level_imports(output):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
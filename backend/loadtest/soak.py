@@ -0,0 +1,350 @@
+# backend/loadtest/soak.py
+#
+# Soak test for the analysis API: boots main:app under uvicorn in this process,
+# with feeds, robots.txt and OpenAI served by loadtest/stubs.py, then starts
+# analysis sessions (POST /api/v1/analysis/, then status polls until the task
+# finishes) at a fixed arrival rate and reports throughput, latency
+# percentiles, event-loop lag of the server and growth of the in-memory task
+# store.
+# Run from the backend directory: python loadtest/soak.py --rate 20 --duration 600 --authors 500
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+LAG_PROBE_INTERVAL = 0.05
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Soak test the analysis API against stubbed upstreams")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to keep starting sessions")
+    parser.add_argument("--rate", type=float, default=10, help="analysis sessions started per second")
+    parser.add_argument("--concurrency", type=int, default=500, help="maximum sessions in flight")
+    parser.add_argument("--authors", type=int, default=200, help="distinct author URLs to draw from; fewer authors means more coalesced and cached requests")
+    parser.add_argument("--fast-ratio", type=float, default=0.0, help="fraction of sessions requesting the fast mode")
+    parser.add_argument("--medium-ratio", type=float, default=0.0, help="fraction of sessions for Medium rather than Substack authors")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between status polls")
+    parser.add_argument("--repolls", type=int, default=1, help="conditional status polls per session after completion")
+    parser.add_argument("--feed-latency", type=float, default=0.05, help="mean simulated feed and robots.txt latency")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="mean simulated completion latency")
+    parser.add_argument("--llm-rpm", type=int, default=None, help="override LLM_REQUESTS_PER_MINUTE for the run")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="seconds between task store samples")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap usage (slows the server)")
+    parser.add_argument("--log-level", default="WARNING", help="service log level; INFO logs every result in full")
+    parser.add_argument("--workdir", help="directory the server writes output/ into (default: a fresh temporary directory, so stub essays stay out of the real corpus store)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write the report to this file as JSON")
+    return parser.parse_args(argv)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(quantile: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(quantile * len(ordered)))], 4)
+
+    return {"count": len(ordered), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": round(ordered[-1], 4)}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current RSS where /proc is unavailable (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def approx_size(obj, seen: Optional[set] = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key, seen) + approx_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(approx_size(item, seen) for item in obj)
+    return size
+
+
+class ServerThread(threading.Thread):
+    """
+    uvicorn serving main:app on its own event loop, so the load generator does
+    not share (or distort) the loop being measured.
+    """
+
+    def __init__(self, app):
+        super().__init__(daemon=True)
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start_and_wait(self, timeout: float = 60) -> str:
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def wait_for_preflight(self, app, timeout: float = 120):
+        # Measure from a warm server: NLTK data, pandas and friends are loaded by then
+        async def preflight():
+            try:
+                await app.state.preflight
+            except Exception as e:
+                print(f"Preflight failed: {e}", flush=True)
+        self.call(preflight()).result(timeout=timeout)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join(timeout=30)
+
+
+class ServerProbes:
+    """
+    Runs on the server's loop: how late short sleeps wake up (event-loop lag),
+    and periodic samples of the task store and process memory.
+    """
+
+    def __init__(self, sample_interval: float, use_tracemalloc: bool):
+        self.sample_interval = sample_interval
+        self.use_tracemalloc = use_tracemalloc
+        self.lag: List[float] = []
+        self.samples: List[dict] = []
+        self.stopped = False
+
+    async def probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while not self.stopped:
+            started = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.lag.append(max(0.0, loop.time() - started - LAG_PROBE_INTERVAL))
+
+    def sample(self, elapsed: float) -> dict:
+        from app.api.v1.endpoints import analysis
+        sample = {
+            "elapsed": round(elapsed, 1),
+            "tasks": len(analysis.analysis_results),
+            "inflight": len(analysis.inflight_analyses),
+            "status_cache": len(analysis.status_cache.entries),
+            "result_cache": len(analysis.result_cache.entries),
+            "task_store_mb": round(approx_size(analysis.analysis_results) / 2**20, 2),
+            "rss_mb": round(rss_mb(), 1),
+        }
+        if self.use_tracemalloc:
+            sample["traced_mb"] = round(tracemalloc.get_traced_memory()[0] / 2**20, 1)
+        return sample
+
+    async def sample_store(self):
+        started = time.monotonic()
+        while not self.stopped:
+            self.samples.append(self.sample(time.monotonic() - started))
+            await asyncio.sleep(self.sample_interval)
+        self.samples.append(self.sample(time.monotonic() - started))
+
+
+class LoadStats:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.outcomes: Counter = Counter()
+        self.requests = 0
+        self.started_sessions = 0
+
+    async def timed(self, kind: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception as e:
+            self.statuses[f"{kind}:{e.__class__.__name__}"] += 1
+            raise
+        finally:
+            self.requests += 1
+            self.latency[kind].append(time.perf_counter() - started)
+        self.statuses[f"{kind}:{response.status_code}"] += 1
+        return response
+
+
+async def analysis_session(client, stats: LoadStats, url: str, mode: str, args: argparse.Namespace):
+    started = time.perf_counter()
+    try:
+        response = await stats.timed("post", client.post("/api/v1/analysis/", json={"url": url, "mode": mode}))
+        body = response.json()
+        task_id, status = body.get("task_id"), body.get("status")
+        etag = None
+        while status == "processing":
+            await asyncio.sleep(args.poll_interval)
+            response = await stats.timed("status", client.get(f"/api/v1/analysis/status/{task_id}"))
+            status = response.json().get("status") if response.status_code == 200 else f"http_{response.status_code}"
+            etag = response.headers.get("etag")
+        stats.latency[f"analysis:{mode}"].append(time.perf_counter() - started)
+        stats.outcomes[status] += 1
+        for _ in range(args.repolls if etag else 0):
+            await asyncio.sleep(args.poll_interval)
+            await stats.timed("status_revalidate", client.get(f"/api/v1/analysis/status/{task_id}", headers={"If-None-Match": etag}))
+    except Exception:
+        stats.outcomes["client_error"] += 1
+
+
+def author_url(rng: random.Random, args: argparse.Namespace) -> str:
+    author = f"loadtest-author-{rng.randrange(args.authors)}"
+    if rng.random() < args.medium_ratio:
+        return f"https://medium.com/@{author}"
+    return f"https://{author}.substack.com/"
+
+
+async def drive(base_url: str, args: argparse.Namespace, stats: LoadStats, progress):
+    from loadtest.stubs import REAL_ASYNC_CLIENT
+    import httpx
+
+    rng = random.Random(args.seed)
+    sessions = set()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with REAL_ASYNC_CLIENT(base_url=base_url, limits=limits, timeout=httpx.Timeout(120.0)) as client:
+        started = time.monotonic()
+        next_report = started + 10
+        while time.monotonic() - started < args.duration:
+            # Open loop: arrivals keep their schedule even when the server falls behind, up to --concurrency
+            target = int((time.monotonic() - started) * args.rate) + 1
+            while stats.started_sessions < target and len(sessions) < args.concurrency:
+                mode = "fast" if rng.random() < args.fast_ratio else "full"
+                session = asyncio.create_task(analysis_session(client, stats, author_url(rng, args), mode, args))
+                session.add_done_callback(sessions.discard)
+                sessions.add(session)
+                stats.started_sessions += 1
+            if time.monotonic() >= next_report:
+                progress(time.monotonic() - started, len(sessions))
+                next_report += 10
+            await asyncio.sleep(0.01)
+        if sessions:
+            await asyncio.wait(sessions)
+        return time.monotonic() - started
+
+
+def build_report(args: argparse.Namespace, stats: LoadStats, probes: ServerProbes, elapsed: float, upstream_calls: Counter) -> dict:
+    completed = stats.outcomes.get("completed", 0)
+    first, last = probes.samples[0], probes.samples[-1]
+    new_tasks = max(1, last["tasks"] - first["tasks"])
+    return {
+        "config": vars(args),
+        "elapsed_seconds": round(elapsed, 1),
+        "sessions": {"started": stats.started_sessions, **dict(stats.outcomes)},
+        "throughput": {
+            "completed_analyses_per_second": round(completed / elapsed, 2),
+            "requests_per_second": round(stats.requests / elapsed, 2),
+        },
+        "latency_seconds": {kind: percentiles(samples) for kind, samples in sorted(stats.latency.items())},
+        "http_statuses": dict(sorted(stats.statuses.items())),
+        "event_loop_lag_seconds": percentiles(probes.lag),
+        "task_store": {
+            "first": first,
+            "last": last,
+            "task_store_kb_per_task": round((last["task_store_mb"] - first["task_store_mb"]) * 1024 / new_tasks, 2),
+            "rss_kb_per_task": round((last["rss_mb"] - first["rss_mb"]) * 1024 / new_tasks, 2),
+        },
+        "task_store_samples": probes.samples,
+        "upstream_calls": dict(upstream_calls),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{report['elapsed_seconds']}s, sessions: {report['sessions']}")
+    print(f"throughput: {report['throughput']['completed_analyses_per_second']} analyses/s, {report['throughput']['requests_per_second']} requests/s")
+    print(f"{'latency (s)':<22}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for kind, stats in list(report["latency_seconds"].items()) + [("event loop lag", report["event_loop_lag_seconds"])]:
+        if stats:
+            print(f"{kind:<22}{stats['count']:>8}{stats['p50']:>10}{stats['p90']:>10}{stats['p99']:>10}{stats['max']:>10}")
+    store = report["task_store"]
+    print(f"task store: {store['first']['tasks']} -> {store['last']['tasks']} tasks, "
+          f"{store['first']['task_store_mb']} -> {store['last']['task_store_mb']} MB ({store['task_store_kb_per_task']} KB/task), "
+          f"RSS {store['first']['rss_mb']} -> {store['last']['rss_mb']} MB ({store['rss_kb_per_task']} KB/task)")
+    print(f"http statuses: {report['http_statuses']}")
+    print(f"upstream calls: {report['upstream_calls']}")
+
+
+def run_soak(args: argparse.Namespace) -> dict:
+    # Configured before the service is imported: it reads settings and sets up logging at import time
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+    os.environ.setdefault("LLM_PROVIDERS", "openai")
+    if args.llm_rpm is not None:
+        os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.llm_rpm)
+
+    previous_cwd = os.getcwd()
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix="soak-"))
+
+    from loadtest import stubs
+    upstreams = stubs.StubUpstreams(args.feed_latency, args.llm_latency, args.seed)
+    stubs.install(upstreams)
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        from main import app
+        server = ServerThread(app)
+        base_url = server.start_and_wait()
+        server.wait_for_preflight(app)
+        probes = ServerProbes(args.sample_interval, args.tracemalloc)
+        probe_tasks = [server.call(probes.probe_lag()), server.call(probes.sample_store())]
+        stats = LoadStats()
+
+        def progress(elapsed: float, in_flight: int):
+            lag = percentiles(probes.lag[-200:])
+            print(f"[{elapsed:6.0f}s] started {stats.started_sessions}, in flight {in_flight}, "
+                  f"outcomes {dict(stats.outcomes)}, loop lag p99 {lag.get('p99', 0)}s, "
+                  f"tasks {probes.samples[-1]['tasks'] if probes.samples else 0}", flush=True)
+
+        try:
+            elapsed = asyncio.run(drive(base_url, args, stats, progress))
+        finally:
+            probes.stopped = True
+            for task in probe_tasks:
+                task.result(timeout=args.sample_interval + 5)
+            server.stop()
+        return build_report(args, stats, probes, elapsed, upstreams.calls)
+    finally:
+        stubs.uninstall()
+        os.chdir(previous_cwd)
+        if args.tracemalloc:
+            tracemalloc.stop()
+
+
+def main():
+    args = parse_args()
+    report = run_soak(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
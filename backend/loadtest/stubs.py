@@ -0,0 +1,194 @@
+# backend/loadtest/stubs.py
+#
+# Stand-ins for everything the service reaches over HTTP during an analysis:
+# author feeds, robots.txt and the OpenAI API. Feeds are generated from a
+# recorded Substack feed, with each author getting a deterministic reshuffle of
+# its sentences so that essays differ between authors (and are not folded
+# together by near-duplicate detection). Completions are canned; streamed
+# requests get server-sent events in a few chunks, like the real API.
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from html import escape
+from typing import List, Tuple
+
+import httpx
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORDED_FEED = os.path.join(FIXTURES_DIR, "substack_feed.xml")
+COMPLETIONS = os.path.join(FIXTURES_DIR, "completions.json")
+
+CONTENT_NS = "{http://purl.org/rss/1.0/modules/content/}"
+SENTENCES_PER_PARAGRAPH = 3
+PARAGRAPHS_PER_POST = 5
+
+REAL_ASYNC_CLIENT = httpx.AsyncClient
+REAL_CLIENT = httpx.Client
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_TAG = re.compile(r"<[^>]+>")
+
+
+def load_recorded_feed(path: str = RECORDED_FEED) -> List[dict]:
+    items = []
+    for item in ET.parse(path).getroot().iter("item"):
+        html = item.findtext(f"{CONTENT_NS}encoded") or ""
+        paragraphs = [_TAG.sub("", paragraph) for paragraph in re.findall(r"<p>(.*?)</p>", html, re.S)]
+        items.append({
+            "title": item.findtext("title"),
+            "slug": item.findtext("link").rstrip("/").rsplit("/", 1)[-1],
+            "published": item.findtext("pubDate"),
+            "sentences": [sentence for paragraph in paragraphs for sentence in _SENTENCE.split(paragraph.strip()) if sentence],
+        })
+    return items
+
+
+class StubUpstreams:
+    """
+    An httpx MockTransport handler serving feeds, robots.txt and OpenAI
+    responses with configurable simulated latency (uniform between half and
+    one and a half times the mean).
+    """
+
+    def __init__(self, feed_latency: float = 0.05, llm_latency: float = 0.4, seed: int = 0):
+        self.feed_latency = feed_latency
+        self.llm_latency = llm_latency
+        self.seed = seed
+        self.items = load_recorded_feed()
+        self.pool = [sentence for item in self.items for sentence in item["sentences"]]
+        with open(COMPLETIONS) as f:
+            self.completions = json.load(f)
+        self.calls: Counter = Counter()
+
+    def _delay(self, mean: float) -> float:
+        return random.uniform(0.5 * mean, 1.5 * mean) if mean > 0 else 0.0
+
+    def author_feed(self, author: str) -> str:
+        rng = random.Random(f"{self.seed}:{author}")
+        entries = []
+        for item in self.items:
+            paragraphs = [
+                " ".join(rng.sample(self.pool, SENTENCES_PER_PARAGRAPH))
+                for _ in range(PARAGRAPHS_PER_POST)
+            ]
+            content = "".join(f"<p>{escape(paragraph)}</p>" for paragraph in paragraphs)
+            entries.append(
+                f"<item><title><![CDATA[{item['title']}]]></title>"
+                f"<link>https://{author}.substack.com/p/{item['slug']}</link>"
+                f"<pubDate>{item['published']}</pubDate>"
+                f"<content:encoded><![CDATA[{content}]]></content:encoded></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss xmlns:content="http://purl.org/rss/1.0/modules/content/" version="2.0"><channel>'
+            f"<title>{escape(author)}</title><link>https://{author}.substack.com</link>"
+            + "".join(entries)
+            + "</channel></rss>"
+        )
+
+    def _chat_text(self, payload: dict) -> str:
+        system = next((message["content"] for message in payload.get("messages", []) if message["role"] == "system"), "")
+        # The combine prompt is the only one asking for JSON
+        if "JSON" in system:
+            return json.dumps(self.completions["combine"])
+        return "\n".join(self.completions["extract"])
+
+    def _chat_response(self, payload: dict) -> httpx.Response:
+        text = self._chat_text(payload)
+        model = payload.get("model", "stub")
+        created = int(time.time())
+        if not payload.get("stream"):
+            return httpx.Response(200, json={
+                "id": "chatcmpl-loadtest",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        third = max(1, len(text) // 3)
+        chunks = [text[start:start + third] for start in range(0, len(text), third)]
+        events = [
+            {"id": "chatcmpl-loadtest", "object": "chat.completion.chunk", "created": created, "model": model,
+             "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+            for chunk in chunks
+        ]
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode("utf-8"), headers={"content-type": "text/event-stream"})
+
+    def _embedding_response(self, payload: dict) -> httpx.Response:
+        inputs = payload.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        dimension = self.completions["embedding_dimension"]
+        return httpx.Response(200, json={
+            "object": "list",
+            "data": [{"object": "embedding", "index": index, "embedding": [0.0] * dimension} for index in range(len(inputs))],
+            "model": payload.get("model", "stub"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    def respond(self, request: httpx.Request) -> Tuple[str, httpx.Response]:
+        host, path = request.url.host, request.url.path
+        if host == "api.openai.com":
+            payload = json.loads(request.content or b"{}")
+            if path.endswith("/chat/completions"):
+                return "llm", self._chat_response(payload)
+            if path.endswith("/embeddings"):
+                return "embedding", self._embedding_response(payload)
+            return "unknown", httpx.Response(404)
+        if path == "/robots.txt":
+            return "robots", httpx.Response(200, text="User-agent: *\nAllow: /\n")
+        if host.endswith(".substack.com") and path.rstrip("/") == "/feed":
+            return "feed", httpx.Response(200, text=self.author_feed(host.split(".")[0]), headers={"content-type": "application/rss+xml"})
+        if host == "medium.com" and path.startswith("/feed/@"):
+            return "feed", httpx.Response(200, text=self.author_feed(path.rsplit("@", 1)[1]), headers={"content-type": "application/rss+xml"})
+        return "unknown", httpx.Response(404)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        kind, response = self.respond(request)
+        self.calls[kind] += 1
+        await asyncio.sleep(self._delay(self.llm_latency if kind in ("llm", "embedding") else self.feed_latency))
+        return response
+
+    def handle_blocking(self, request: httpx.Request) -> httpx.Response:
+        kind, response = self.respond(request)
+        self.calls[kind] += 1
+        time.sleep(self._delay(self.feed_latency))
+        return response
+
+
+def install(stubs: StubUpstreams) -> None:
+    """
+    Route every httpx client the service creates from now on through `stubs`.
+    Clients the harness itself needs must come from REAL_ASYNC_CLIENT.
+    """
+
+    class StubbedAsyncClient(REAL_ASYNC_CLIENT):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("limits", None)
+            kwargs["transport"] = httpx.MockTransport(stubs.handle)
+            super().__init__(*args, **kwargs)
+
+    class StubbedClient(REAL_CLIENT):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("limits", None)
+            kwargs["transport"] = httpx.MockTransport(stubs.handle_blocking)
+            super().__init__(*args, **kwargs)
+
+    httpx.AsyncClient = StubbedAsyncClient
+    httpx.Client = StubbedClient
+
+    # Providers build their HTTP clients lazily; drop any made before the stubs were installed
+    from app.services import llm_providers
+    llm_providers._router = None
+
+
+def uninstall() -> None:
+    httpx.AsyncClient = REAL_ASYNC_CLIENT
+    httpx.Client = REAL_CLIENT
@@ -1,14 +1,34 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.api.v1.endpoints.analysis import router as analysis_router
-import nltk
-nltk.data.path.append('./nltk_data')
+from app.core.config import REFRESH_IN_PROCESS
+from app.core.preflight import run_preflight
 import logging
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Writer Analysis Tool")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm heavy dependencies in a worker thread so the server can bind its port right away;
+    # requests that arrive first load whatever they need on demand.
+    app.state.preflight = asyncio.create_task(asyncio.to_thread(run_preflight))
+    app.state.refresh = None
+    if REFRESH_IN_PROCESS:
+        # Single-process deployments can run the tracked-author refresh alongside the API
+        from app.api.v1.endpoints.analysis import refresh_analysis
+        from app.services.refresh_service import RefreshDaemon
+        app.state.refresh = asyncio.create_task(RefreshDaemon(refresh_analysis).run_forever())
+    yield
+    if not app.state.preflight.done():
+        app.state.preflight.cancel()
+    if app.state.refresh is not None:
+        app.state.refresh.cancel()
+
+app = FastAPI(title="Writer Analysis Tool", lifespan=lifespan)
 
 # Allow all origins
 app.add_middleware(
@@ -17,8 +37,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag"],
 )
 
+# Essay lists in completed results compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(analysis_router, prefix="/api/v1/analysis", tags=["analysis"])
 
 @app.get("/")
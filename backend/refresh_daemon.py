@@ -0,0 +1,28 @@
+# refresh_daemon.py
+
+import argparse
+import asyncio
+import logging
+
+from app.api.v1.endpoints.analysis import refresh_analysis
+from app.services.refresh_service import RefreshDaemon
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Keep stored analyses of tracked authors up to date")
+    parser.add_argument("--once", action="store_true", help="run a single refresh cycle and exit")
+    args = parser.parse_args()
+
+    daemon = RefreshDaemon(refresh_analysis)
+    if not daemon.authors:
+        logger.warning("No tracked authors configured; set TRACKED_AUTHORS or create tracked_authors.txt")
+        return
+    if args.once:
+        await daemon.refresh_once()
+    else:
+        await daemon.run_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -24,9 +24,9 @@ def test_analyze_url():
 def test_text_processing():
     sample_text = "This is a sample text for testing. It contains multiple sentences."
     processed = process_text(sample_text)
-    assert 'processed_text' in processed
-    assert 'sentence_count' in processed
-    assert 'word_count' in processed
+    assert processed.processed_text
+    assert processed.sentence_count == 2
+    assert processed.word_count > 0
 
 
 def test_embedding_generation():
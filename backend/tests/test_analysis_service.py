@@ -0,0 +1,68 @@
+# backend/tests/test_analysis_service.py
+
+import pytest
+
+from app.models.records import Post
+from app.services import analysis_service
+from app.services.analysis_service import STAGES, AnalysisPipeline, PipelineRun
+
+ESSAYS = [
+    "Cities should be built for people rather than cars. Wide roads divide neighbourhoods.",
+    "Remote work changes where people choose to live. Offices become meeting places.",
+    "Cities should be built for people rather than cars. Wide roads divide neighbourhoods.",
+]
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    async def fake_extract(text, on_theme=None):
+        calls.append(text)
+        return {"insights": {"key_themes": [f"theme {len(calls)}"]}}
+
+    async def fake_combine(all_concepts, on_theme=None):
+        return {"key_themes": ["overall"]}
+
+    monkeypatch.setattr(analysis_service, "extract_concepts", fake_extract)
+    monkeypatch.setattr(analysis_service, "combine_concepts", fake_combine)
+    monkeypatch.setattr(analysis_service, "corpus_index", analysis_service.corpus_index.__class__())
+    return calls
+
+async def fixed_posts(run):
+    run.posts = [Post(f"Post {i}", "", f"https://a.substack.com/p/{i}", text, None, None) for i, text in enumerate(ESSAYS)]
+
+@pytest.mark.asyncio
+async def test_each_distinct_essay_goes_to_the_llm_once(llm_calls):
+    progress = []
+    run = PipelineRun("a", on_progress=lambda done, total: progress.append((done, total)))
+    await AnalysisPipeline(scrape=fixed_posts).run(run)
+
+    assert len(llm_calls) == 2
+    assert [essay.key_themes for essay in run.essays] == [["theme 1"], ["theme 2"], ["theme 1"]]
+    assert run.result["overall_analysis"]["key_themes"] == ["overall"]
+    assert run.result["overall_analysis"]["post_count"] == 3
+    assert progress[-1] == (3, 3)
+    assert set(run.timings) == {"scrape", "preprocess", "extract", "combine"}
+
+@pytest.mark.asyncio
+async def test_known_essays_are_not_sent_again(llm_calls):
+    first = await AnalysisPipeline(scrape=fixed_posts).run(PipelineRun("a"))
+    llm_calls.clear()
+
+    await AnalysisPipeline(scrape=fixed_posts).run(PipelineRun("a", known_essays=first.essays))
+    assert llm_calls == []
+
+@pytest.mark.asyncio
+async def test_a_stage_that_sets_the_result_ends_the_run(llm_calls):
+    async def cached(run):
+        run.result = {"cached": True}
+
+    run = await AnalysisPipeline(scrape=cached).run(PipelineRun("a"))
+    assert run.result == {"cached": True}
+    assert list(run.timings) == ["scrape"]
+    assert llm_calls == []
+
+def test_unknown_stage_is_rejected():
+    assert STAGES == ("scrape", "preprocess", "extract", "embed", "combine")
+    with pytest.raises(ValueError):
+        AnalysisPipeline(summarize=fixed_posts)
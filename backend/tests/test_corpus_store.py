@@ -0,0 +1,42 @@
+# backend/tests/test_corpus_store.py
+
+from app.utils.corpus_store import list_authors, read_posts, save_posts
+
+POSTS = [
+    {"title": "One", "subtitle": "", "url": "https://a.substack.com/p/one", "content": 'He said ""hi"".', "date": "Mar 1, 2024", "like_count": "3"},
+    {"title": "Two", "subtitle": "", "url": "https://a.substack.com/p/two", "content": "Second post.", "date": "Mar 2, 2024", "like_count": "5"},
+]
+
+def test_save_posts_dedupes_by_url_and_content(tmp_path):
+    root = str(tmp_path)
+    assert save_posts(POSTS, "a", root=root) is not None
+
+    reprint = dict(POSTS[1], url="https://a.substack.com/p/two-reprint")
+    assert save_posts([POSTS[0], reprint], "a", root=root) is None
+
+    df = read_posts("a", root=root)
+    assert len(df) == 2
+    assert list_authors(root) == ["a"]
+
+def test_read_posts_projects_columns(tmp_path):
+    root = str(tmp_path)
+    save_posts(POSTS, "a", root=root)
+
+    df = read_posts("a", columns=["content"], root=root)
+    assert list(df.columns) == ["content"]
+    assert df["content"].iloc[0] == 'He said "hi".'
+
+def test_read_posts_unknown_author(tmp_path):
+    df = read_posts("nobody", columns=["content"], root=str(tmp_path))
+    assert df.empty
+
+def test_concurrent_saves_of_one_author_store_each_post_once(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    root = str(tmp_path)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(lambda _: save_posts(POSTS, "a", root=root), range(8)))
+
+    assert len([path for path in paths if path is not None]) == 1
+    assert sorted(read_posts("a", columns=["url"], root=root)["url"]) == [post["url"] for post in POSTS]
+    assert not [name for name in (tmp_path / "author=a").iterdir() if name.suffix == ".tmp"]
@@ -0,0 +1,73 @@
+# backend/tests/test_crawl_scheduler.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.utils.crawl_scheduler import BACKGROUND, INTERACTIVE, ROBOTS_ERROR_TTL, CrawlScheduler
+
+@pytest.mark.asyncio
+async def test_interactive_requests_jump_the_background_queue():
+    scheduler = CrawlScheduler(rate=50, burst=1)
+    order = []
+
+    async def fetch(name, priority):
+        await scheduler.acquire("https://writer.substack.com/feed", priority)
+        order.append(name)
+
+    background = [asyncio.ensure_future(fetch(f"bg{i}", BACKGROUND)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(fetch("user", INTERACTIVE))
+    await asyncio.gather(*background, interactive)
+
+    assert order[0] == "bg0"  # the burst token was already handed out
+    assert order[1] == "user"
+
+@pytest.mark.asyncio
+async def test_domains_are_rate_limited_independently():
+    scheduler = CrawlScheduler(rate=10, burst=1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(scheduler.acquire(f"https://{host}/feed") for host in ("a.substack.com", "b.substack.com", "medium.com")))
+    assert loop.time() - started < 0.05
+
+    started = loop.time()
+    await asyncio.gather(*(scheduler.acquire("https://medium.com/feed/@x") for _ in range(3)))
+    assert loop.time() - started >= 0.25
+
+    metrics = scheduler.metrics()
+    assert metrics["queue_wait"]["medium.com"]["interactive"]["requests"] == 4
+
+def test_robots_rules_are_cached_and_applied():
+    scheduler = CrawlScheduler()
+    scheduler._store_robots("https://writer.substack.com", 200, "User-agent: *\nDisallow: /action/\nSitemap: https://writer.substack.com/sitemap.xml")
+    parser = scheduler.robots_blocking("https://writer.substack.com/p/post")
+    assert parser.can_fetch("*", "https://writer.substack.com/p/post")
+    assert not scheduler.allowed_blocking("https://writer.substack.com/action/like")
+    assert scheduler.sitemaps_blocking("https://writer.substack.com/") == ["https://writer.substack.com/sitemap.xml"]
+
+def test_missing_robots_allows_everything():
+    scheduler = CrawlScheduler()
+    scheduler._store_robots("https://medium.com", 404, "")
+    assert scheduler.allowed_blocking("https://medium.com/feed/@someone")
+
+@pytest.mark.parametrize("status_code", [500, 503, None])
+def test_unavailable_robots_disallows_everything(status_code):
+    scheduler = CrawlScheduler()
+    scheduler._store_robots("https://writer.substack.com", status_code, "")
+    assert not scheduler.allowed_blocking("https://writer.substack.com/feed")
+    # Rechecked after the short error TTL rather than the usual one
+    assert scheduler._robots["https://writer.substack.com"][0] <= time.monotonic() + ROBOTS_ERROR_TTL
+
+def test_unreachable_robots_is_treated_as_disallow_all(monkeypatch):
+    import httpx
+
+    class Unreachable(httpx.Client):
+        def get(self, url, **kwargs):
+            raise httpx.ConnectError("connection refused")
+
+    monkeypatch.setattr(httpx, "Client", Unreachable)
+    scheduler = CrawlScheduler()
+    assert not scheduler.allowed_blocking("https://down.substack.com/feed")
+    assert scheduler.sitemaps_blocking("https://down.substack.com/") == ["https://down.substack.com/sitemap.xml"]
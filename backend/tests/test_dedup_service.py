@@ -0,0 +1,32 @@
+# backend/tests/test_dedup_service.py
+
+import random
+
+from app.services.dedup_service import MinHashIndex, cluster_near_duplicates, minhash_signature
+
+random.seed(0)
+VOCABULARY = [f"word{i}" for i in range(3000)]
+ESSAY = [random.choice(VOCABULARY) for _ in range(800)]
+OTHER_ESSAY = [random.choice(VOCABULARY) for _ in range(800)]
+
+def lightly_edited(tokens, edits=10):
+    edited = list(tokens)
+    for _ in range(edits):
+        edited[random.randrange(len(edited))] = random.choice(VOCABULARY)
+    return edited
+
+def test_cluster_near_duplicates_groups_reprints():
+    texts = [ESSAY, OTHER_ESSAY, lightly_edited(ESSAY), []]
+    signatures = [minhash_signature(' '.join(tokens)) for tokens in texts]
+    assert signatures[3] is None
+    assert cluster_near_duplicates(signatures) == [0, 1, 0, 3]
+
+def test_index_query_and_eviction():
+    index = MinHashIndex(max_entries=1)
+    index.add("essay", minhash_signature(' '.join(ESSAY)), {"insights": {"key_themes": ["a"]}})
+    assert index.query(minhash_signature(' '.join(lightly_edited(ESSAY)))) == {"insights": {"key_themes": ["a"]}}
+    assert index.query(minhash_signature(' '.join(OTHER_ESSAY))) is None
+
+    index.add("other", minhash_signature(' '.join(OTHER_ESSAY)), {})
+    assert len(index) == 1
+    assert index.query(minhash_signature(' '.join(ESSAY))) is None
@@ -0,0 +1,40 @@
+# backend/tests/test_http_cache.py
+
+from app.api.v1.endpoints import analysis
+
+RESULT = {
+    "overall_analysis": {"key_themes": ["Theme"], "post_count": 40},
+    "essays": [{"insights": {"key_themes": [f"Essay {i} theme that repeats for a while"]}} for i in range(40)],
+}
+
+def test_result_served_with_etag_and_revalidated(client):
+    result_id = analysis.make_result_id("https://medium.com/@someone", ["essay one", "essay two"])
+    analysis.result_cache.put(result_id, RESULT)
+
+    response = client.get(f"/api/v1/analysis/result/{result_id}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.json() == RESULT
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+
+    etag = response.headers["etag"]
+    revalidated = client.get(f"/api/v1/analysis/result/{result_id}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+def test_result_id_ignores_essay_order():
+    url = "https://medium.com/@someone"
+    assert analysis.make_result_id(url, ["a", "b"]) == analysis.make_result_id(url + "/", ["b", "a"])
+    assert analysis.make_result_id(url, ["a", "b"]) != analysis.make_result_id(url, ["a", "c"])
+
+def test_completed_status_supports_conditional_requests(client):
+    analysis.analysis_results["done-task"] = {"status": "completed", "result": RESULT, "progress": 100, "result_id": "r"}
+    analysis.status_cache.put("done-task", analysis.analysis_results["done-task"])
+
+    response = client.get("/api/v1/analysis/status/done-task")
+    assert response.json()["result"] == RESULT
+    revalidated = client.get("/api/v1/analysis/status/done-task", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+def test_unknown_result_is_404(client):
+    assert client.get("/api/v1/analysis/result/missing").status_code == 404
@@ -0,0 +1,92 @@
+# backend/tests/test_keyphrases.py
+
+import numpy as np
+import pytest
+
+from app.models.records import Post
+from app.services import analysis_service
+from app.services.analysis_service import FAST_STAGES, AnalysisPipeline, PipelineRun
+from app.services.keyphrases import BackgroundCorpus, KeyphraseModel
+
+AUTHOR_ESSAYS = [
+    "urban transit buses cities people transit funding trains",
+    "zoning reform housing cities people urban transit density",
+    "urban transit ridership cities people weekend trains",
+]
+
+def test_recurring_phrases_rank_first():
+    themes = KeyphraseModel(AUTHOR_ESSAYS).top_phrases(2)
+    assert themes[0] == "urban transit"
+    # "urban" and "transit" on their own are covered by the phrase and not repeated
+    assert "urban" not in themes and "transit" not in themes
+
+def test_background_corpus_demotes_common_terms():
+    background = BackgroundCorpus.from_texts(["Cities and people. People in cities."] * 50)
+    assert background.documents == 50
+    assert background.doc_freq["cities people"] == 50
+
+    assert KeyphraseModel(AUTHOR_ESSAYS).top_phrases(2) == ["urban transit", "cities people"]
+    assert KeyphraseModel(AUTHOR_ESSAYS, background).top_phrases(2) == ["urban transit", "trains"]
+
+def test_condense_keeps_the_highest_scoring_passage_in_order():
+    filler = " ".join(f"filler{i}" for i in range(40))
+    essay = f"{filler} transit transit transit transit {filler}"
+    model = KeyphraseModel([essay, "transit transit budget"])
+    condensed = model.condense(0, max_words=20, window=20)
+    assert len(condensed.split()) == 20
+    assert "transit" in condensed.split()
+    assert model.condense(1, max_words=40) == "transit transit budget"
+
+@pytest.mark.asyncio
+async def test_fast_mode_needs_no_llm(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("fast mode must not call the LLM")
+
+    async def posts(run):
+        run.posts = [Post(f"Post {i}", "", f"https://a.substack.com/p/{i}", text, None, None) for i, text in enumerate(AUTHOR_ESSAYS)]
+
+    monkeypatch.setattr(analysis_service, "extract_concepts", fail)
+    monkeypatch.setattr(analysis_service, "combine_concepts", fail)
+    monkeypatch.setattr(analysis_service, "get_background_corpus", lambda: BackgroundCorpus({}, 0))
+
+    run = await AnalysisPipeline(scrape=posts, **FAST_STAGES).run(PipelineRun("a", mode="fast"))
+    assert run.result["overall_analysis"]["key_themes"][0] == "urban transit"
+    assert run.result["overall_analysis"]["post_count"] == 3
+    assert all(len(essay["insights"]["key_themes"]) == 3 for essay in run.result["essays"])
+    assert set(run.timings) == {"scrape", "preprocess", "extract"}
+
+def test_stored_essays_of_the_author_are_not_counted_twice():
+    background = BackgroundCorpus.from_texts(AUTHOR_ESSAYS + ["gardening tomatoes"] * 3, authors=["a", "b"])
+    frequencies = KeyphraseModel(AUTHOR_ESSAYS).doc_freq
+    terms = KeyphraseModel(AUTHOR_ESSAYS).terms
+    as_stored = background.idf(terms, frequencies, len(AUTHOR_ESSAYS), author="a")
+    unstored = background.idf(terms, frequencies, len(AUTHOR_ESSAYS), author="c")
+    # "urban transit" is in all three of the author's essays and nowhere else
+    position = terms.index("urban transit")
+    assert as_stored[position] == pytest.approx(np.log(7 / 4) + 1)
+    assert unstored[position] == pytest.approx(np.log(10 / 7) + 1)
+
+def test_background_is_rebuilt_off_the_request_path(monkeypatch):
+    import threading
+
+    from app.services import keyphrases
+
+    release = threading.Event()
+    stale = BackgroundCorpus({"old": 1}, 1)
+
+    def slow_build():
+        release.wait(5)
+        corpus = BackgroundCorpus({"new": 1}, 1)
+        keyphrases._background = (corpus, keyphrases.time.monotonic())
+        return corpus
+
+    monkeypatch.setattr(keyphrases, "_background", (stale, 0.0))
+    monkeypatch.setattr(keyphrases, "_build_background_corpus", slow_build)
+
+    # Stale: the old copy is served at once while the rebuild waits
+    assert keyphrases.get_background_corpus(ttl=0) is stale
+    assert keyphrases.get_background_corpus(ttl=0) is stale
+    release.set()
+    with keyphrases._rebuild_lock:
+        pass
+    assert keyphrases.get_background_corpus().doc_freq == {"new": 1}
@@ -0,0 +1,101 @@
+# backend/tests/test_llm_providers.py
+
+import asyncio
+
+import pytest
+
+from app.services.llm_providers import ChatProvider, LLMRouter
+
+class FakeProvider(ChatProvider):
+    def __init__(self, name, delay=0.0, error=None, chunks=("ok",), first_token_delay=0.0):
+        super().__init__("fake-model", max_concurrency=4, requests_per_minute=6000)
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.first_token_delay = first_token_delay
+        self.calls = 0
+        self.closed = False
+
+    async def _complete(self, system, user, temperature):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{self.name}:{user}"
+
+    async def _stream(self, system, user, temperature):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.first_token_delay)
+            if self.error:
+                raise self.error
+            for chunk in self.chunks:
+                yield chunk
+        finally:
+            self.closed = True
+
+@pytest.mark.asyncio
+async def test_fails_over_on_error():
+    broken, healthy = FakeProvider("broken", error=RuntimeError("500")), FakeProvider("healthy")
+    router = LLMRouter([broken, healthy], default_hedge_delay=5)
+    assert await router.complete("system", "essay") == "healthy:essay"
+    assert broken.is_cooling_down()
+    # the failed provider is demoted for subsequent requests
+    assert router.ordered_providers()[0] is healthy
+
+@pytest.mark.asyncio
+async def test_hedges_slow_primary():
+    slow, fast = FakeProvider("slow", delay=1.0), FakeProvider("fast", delay=0.01)
+    router = LLMRouter([slow, fast], default_hedge_delay=0.05)
+    started = asyncio.get_running_loop().time()
+    assert await router.complete("system", "essay") == "fast:essay"
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert slow.calls == 1 and fast.calls == 1
+
+@pytest.mark.asyncio
+async def test_raises_when_every_provider_fails():
+    router = LLMRouter([FakeProvider("a", error=RuntimeError("a")), FakeProvider("b", error=ValueError("b"))])
+    with pytest.raises(ValueError):
+        await router.complete("system", "essay")
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_first_token():
+    router = LLMRouter([FakeProvider("broken", error=RuntimeError("500")), FakeProvider("healthy", chunks=("a", "b"))])
+    assert [chunk async for chunk in router.stream("system", "essay")] == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_streams_record_time_to_first_token_separately():
+    provider = FakeProvider("streaming", chunks=("a", "b"))
+    assert [chunk async for chunk in provider.stream("system", "essay")] == ["a", "b"]
+    assert len(provider.first_token_latencies) == 1
+    # Whole-stream durations would inflate the p95 the router hedges on
+    assert not provider.latencies
+
+def test_chat_provider_is_abstract():
+    with pytest.raises(TypeError):
+        ChatProvider("model")
+
+@pytest.mark.asyncio
+async def test_stream_hedges_slow_first_token():
+    slow = FakeProvider("slow", chunks=("s1", "s2"), first_token_delay=1.0)
+    fast = FakeProvider("fast", chunks=("f1", "f2"))
+    router = LLMRouter([slow, fast], default_hedge_delay=0.05)
+    started = asyncio.get_running_loop().time()
+    assert [chunk async for chunk in router.stream("system", "essay")] == ["f1", "f2"]
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert slow.calls == 1 and fast.calls == 1
+    # The losing stream is cancelled, not left running or counted as a failure
+    assert slow.closed and not slow.is_cooling_down()
+
+def test_streams_are_ranked_on_time_to_first_token():
+    quick_stream, slow_stream = FakeProvider("quick_stream"), FakeProvider("slow_stream")
+    for _ in range(20):
+        quick_stream.latencies.append(10.0)
+        quick_stream.first_token_latencies.append(0.2)
+        slow_stream.latencies.append(1.0)
+        slow_stream.first_token_latencies.append(3.0)
+    router = LLMRouter([slow_stream, quick_stream])
+    assert router.ordered_providers()[0] is slow_stream
+    assert router.ordered_providers(streamed=True)[0] is quick_stream
+    assert router.hedge_delay(slow_stream, streamed=True) == 3.0
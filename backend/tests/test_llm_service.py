@@ -0,0 +1,64 @@
+# backend/tests/test_llm_service.py
+
+import pytest
+
+from app.services import llm_service
+
+def essay_themes(i):
+    return [f"Essay {i} argues that idea {i} changes how people think about topic {i}."] * 3
+
+@pytest.fixture
+def fake_combine(monkeypatch):
+    calls = []
+
+    async def combine_once(all_concepts, label="Essay", on_theme=None):
+        calls.append(len(all_concepts))
+        return {"key_themes": [f"{label} summary of {len(all_concepts)} items {len(calls)}"]}
+
+    monkeypatch.setattr(llm_service, "_combine_once", combine_once)
+    monkeypatch.setattr(llm_service, "COMBINE_TOKEN_BUDGET", 200)
+    monkeypatch.setattr(llm_service, "_combine_cache", llm_service.OrderedDict())
+    return calls
+
+@pytest.mark.asyncio
+async def test_small_archives_combine_in_one_call(fake_combine):
+    await llm_service.combine_concepts([essay_themes(1), essay_themes(2)])
+    assert fake_combine == [2]
+
+@pytest.mark.asyncio
+async def test_large_archives_are_tree_reduced(fake_combine):
+    essays = [essay_themes(i) for i in range(40)]
+    result = await llm_service.combine_concepts(essays)
+    assert result["key_themes"]
+    assert len(fake_combine) > 2
+    assert max(fake_combine) < 40
+
+@pytest.mark.asyncio
+async def test_adding_an_essay_recomputes_one_branch(fake_combine):
+    essays = [essay_themes(i) for i in range(40)]
+    first_level = len(llm_service.plan_combine_batches(essays))
+    await llm_service.combine_concepts(essays)
+    fake_combine.clear()
+
+    await llm_service.combine_concepts([essay_themes(99)] + essays)
+    # One leaf batch plus the levels above it
+    assert first_level > 3
+    assert len(fake_combine) <= 3
+
+def test_partial_theme_parser_yields_completed_elements():
+    parser = llm_service.PartialThemeParser()
+    stream = '```json\n{"key_themes": ["First tr', 'end", {"theme": "Sec', 'ond"}, "Third"', ']}\n```'
+    seen = [parser.feed(chunk) for chunk in stream]
+    assert seen == [[], ["First trend"], [{"theme": "Second"}, "Third"], []]
+
+@pytest.mark.asyncio
+async def test_extract_concepts_streams_lines(monkeypatch):
+    async def fake_stream(system, user):
+        for delta in ["1. Idea one\n2. Ide", "a two\n", "3. Idea three"]:
+            yield delta
+
+    monkeypatch.setattr(llm_service, "stream_completion", fake_stream)
+    seen = []
+    result = await llm_service.extract_concepts("essay text", seen.append)
+    assert seen == ["1. Idea one", "2. Idea two", "3. Idea three"]
+    assert result == {"insights": {"key_themes": seen}}
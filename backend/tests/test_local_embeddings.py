@@ -0,0 +1,49 @@
+# backend/tests/test_local_embeddings.py
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.local_embeddings import BatchingEmbedder
+
+def fake_model(batches):
+    def embed_batch(texts):
+        batches.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts])
+    return embed_batch
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_batches():
+    batches = []
+    embedder = BatchingEmbedder(fake_model(batches), batch_size=4, max_wait=0.05)
+    texts = [f"text {i}" * (i + 1) for i in range(10)]
+
+    vectors = await asyncio.gather(*(embedder.embed(text) for text in texts))
+
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert embedder.metrics()["avg_batch_size"] == pytest.approx(10 / 3, abs=0.01)
+
+@pytest.mark.asyncio
+async def test_lone_request_is_not_held_for_a_full_batch():
+    embedder = BatchingEmbedder(fake_model([]), batch_size=64, max_wait=0.01)
+    assert await asyncio.wait_for(embedder.embed("alone"), timeout=1) == [5.0, 1.0]
+
+@pytest.mark.asyncio
+async def test_model_errors_reach_every_caller_in_the_batch():
+    def broken(texts):
+        raise RuntimeError("model failed")
+
+    embedder = BatchingEmbedder(broken, batch_size=8, max_wait=0.01)
+    results = await asyncio.gather(embedder.embed("a"), embedder.embed("b"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # The worker survives and keeps serving
+    embedder.embed_batch = fake_model([])
+    assert await embedder.embed("ok") == [2.0, 1.0]
+
+@pytest.mark.asyncio
+async def test_short_model_output_fails_the_batch_instead_of_hanging():
+    embedder = BatchingEmbedder(lambda texts: np.ones((len(texts) - 1, 2)), batch_size=8, max_wait=0.01)
+    results = await asyncio.wait_for(asyncio.gather(embedder.embed("a"), embedder.embed("b"), return_exceptions=True), timeout=1)
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,62 @@
+# backend/tests/test_profiling.py
+
+import tracemalloc
+
+import pytest
+
+from app.core.profiling import ProfileBusy, TaskProfile, profile_reports
+from app.services.analysis_service import AnalysisPipeline, PipelineRun
+
+async def build_posts(run):
+    run.posts = [bytearray(4096) for _ in range(256)]
+
+async def finish(run):
+    run.result = {"posts": len(run.posts)}
+
+@pytest.mark.asyncio
+async def test_profiled_run_reports_stages_functions_and_allocations():
+    profile = TaskProfile("task-1", "https://a.substack.com/")
+    pipeline = AnalysisPipeline(scrape=build_posts, preprocess=None, extract=None, combine=finish)
+    with profile.capture():
+        run = await pipeline.run(PipelineRun("a", profile=profile))
+
+    report = profile_reports.get("task-1")
+    assert report is profile.report
+    assert run.result == {"posts": 256}
+    assert report["status"] == "completed"
+    assert set(report["stages"]) == {"scrape", "combine"}
+    assert report["stages"]["scrape"]["retained_kb"] >= 1024
+    assert any("build_posts" in row["function"] for row in report["top_functions"])
+    assert any("test_profiling.py" in row["location"] for row in report["top_allocations"])
+    assert TaskProfile.active is None
+    assert not tracemalloc.is_tracing()
+
+def test_only_one_task_is_profiled_at_a_time():
+    with TaskProfile("task-2", "https://a.substack.com/").capture():
+        with pytest.raises(ProfileBusy):
+            with TaskProfile("task-3", "https://b.substack.com/").capture():
+                pass
+    assert profile_reports.get("task-3") is None
+    assert profile_reports.get("task-2")["status"] == "completed"
+
+def test_profile_endpoint_claims_the_slot_before_the_task_starts(client, monkeypatch):
+    from app.api.v1.endpoints import analysis
+
+    scheduled = []
+
+    async def not_started_yet(url, task_id, priority, profile):
+        scheduled.append(profile)
+
+    monkeypatch.setattr(analysis, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(analysis, "analyze_url_background", not_started_yet)
+
+    first = client.post("/api/v1/analysis/profile", json={"url": "https://a.substack.com/"})
+    second = client.post("/api/v1/analysis/profile", json={"url": "https://b.substack.com/"})
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert first.json()["task_id"] in second.json()["detail"]
+    assert [profile.task_id for profile in scheduled] == [first.json()["task_id"]]
+
+    scheduled[0].release()
+    assert client.post("/api/v1/analysis/profile", json={"url": "https://b.substack.com/"}).status_code == 200
+    scheduled[1].release()
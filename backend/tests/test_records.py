@@ -0,0 +1,36 @@
+# backend/tests/test_records.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models.records import EssayInsights, Post, pack_records, parse_date, parse_like_count, unpack_records
+
+def test_parse_like_count():
+    assert parse_like_count("42") == 42
+    assert parse_like_count("1,204") == 1204
+    assert parse_like_count("1.2K") == 1200
+    assert parse_like_count("N/A") is None
+    assert parse_like_count("Like count not available") is None
+
+def test_parse_date_handles_feed_and_page_formats():
+    assert parse_date("Fri, 01 Mar 2024 12:00:00 GMT") == datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    assert parse_date("Mar 1, 2024") == datetime(2024, 3, 1, tzinfo=timezone.utc)
+    assert parse_date("Date not available") is None
+
+def test_records_are_slotted():
+    post = Post.from_strings("T", "", "https://a.substack.com/p/t", "Body", "Mar 1, 2024", "7")
+    assert not hasattr(post, "__dict__")
+    with pytest.raises(AttributeError):
+        post.extra = 1
+    assert post.to_row()["like_count"] == "7"
+
+def test_pack_round_trip():
+    posts = [
+        Post.from_strings("T", "", "https://a.substack.com/p/t", 'He said ""hi"".', "Fri, 01 Mar 2024 12:00:00 GMT", "N/A"),
+        Post("U", "sub", "https://a.substack.com/p/u", "Other", None, 3),
+    ]
+    assert unpack_records(Post, pack_records(posts)) == posts
+
+    essays = [EssayInsights("abc", ["one", "two"], 12, 240, 61.2, "positive", 0.42, 20.0, 6.5, 7.8)]
+    assert unpack_records(EssayInsights, pack_records(essays)) == essays
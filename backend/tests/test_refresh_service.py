@@ -0,0 +1,96 @@
+# backend/tests/test_refresh_service.py
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import refresh_service
+from app.services.refresh_service import FeedCheck, RefreshDaemon, in_hour_window, load_tracked_authors, parse_hour_window
+from app.utils.analysis_store import load_analysis, save_analysis
+
+AUTHOR = "https://writer.substack.com/"
+OFFPEAK = datetime(2024, 3, 1, 3, tzinfo=timezone.utc)
+PEAK = datetime(2024, 3, 1, 15, tzinfo=timezone.utc)
+
+def test_hour_window_wraps_past_midnight():
+    window = parse_hour_window("22-5")
+    assert in_hour_window(23, window) and in_hour_window(0, window)
+    assert not in_hour_window(5, window) and not in_hour_window(12, window)
+
+def test_tracked_authors_are_canonicalized(tmp_path, monkeypatch):
+    monkeypatch.setattr(refresh_service, "TRACKED_AUTHORS", ["https://writer.substack.com/p/some-post"])
+    path = tmp_path / "tracked.txt"
+    path.write_text("# comment\nhttps://medium.com/@someone\n\nhttps://writer.substack.com\n")
+    assert load_tracked_authors(str(path)) == [AUTHOR, "https://medium.com/@someone"]
+
+def test_analysis_store_round_trip(tmp_path):
+    root = str(tmp_path)
+    assert load_analysis(AUTHOR, root=root) is None
+    save_analysis(AUTHOR, {"overall_analysis": {"key_themes": ["a"]}}, "abc", root=root)
+    stored = load_analysis(AUTHOR, root=root)
+    assert stored["result_id"] == "abc"
+    assert stored["result"]["overall_analysis"]["key_themes"] == ["a"]
+
+def make_daemon(tmp_path, monkeypatch, check, budget=1_000_000):
+    analyzed = []
+
+    async def analyze(url):
+        analyzed.append(url)
+        return {"status": "completed"}
+
+    async def check_feed(author_url):
+        return check
+
+    daemon = RefreshDaemon(analyze, authors=[AUTHOR], offpeak_hours="1-6", daily_token_budget=budget, state_file=str(tmp_path / "state.json"))
+    monkeypatch.setattr(daemon, "check_feed", check_feed)
+    return daemon, analyzed
+
+@pytest.mark.asyncio
+async def test_new_posts_are_analyzed_off_peak_only(tmp_path, monkeypatch):
+    check = FeedCheck(changed=True, etag='"v2"', links=["https://writer.substack.com/p/new"], texts=["A new essay."])
+    daemon, analyzed = make_daemon(tmp_path, monkeypatch, check)
+
+    assert await daemon.refresh_once(PEAK) == {AUTHOR: "deferred"}
+    assert analyzed == []
+
+    assert await daemon.refresh_once(OFFPEAK) == {AUTHOR: "refreshed"}
+    assert analyzed == [AUTHOR]
+    assert RefreshDaemon(None, authors=[], state_file=daemon.state_file).state["authors"][AUTHOR]["etag"] == '"v2"'
+
+@pytest.mark.asyncio
+async def test_refresh_respects_daily_token_budget(tmp_path, monkeypatch):
+    check = FeedCheck(changed=True, links=["https://writer.substack.com/p/new"], texts=["word " * 500])
+    daemon, analyzed = make_daemon(tmp_path, monkeypatch, check, budget=100)
+
+    assert await daemon.refresh_once(OFFPEAK) == {AUTHOR: "over_budget"}
+    assert analyzed == []
+    assert AUTHOR not in daemon.state["authors"]
+
+@pytest.mark.asyncio
+async def test_unchanged_feed_is_not_analyzed(tmp_path, monkeypatch):
+    daemon, analyzed = make_daemon(tmp_path, monkeypatch, FeedCheck(changed=False))
+    assert await daemon.refresh_once(OFFPEAK) == {AUTHOR: "unchanged"}
+    assert analyzed == []
+
+@pytest.mark.asyncio
+async def test_unchanged_feed_keeps_new_validators_and_confirms_the_analysis(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_analysis(AUTHOR, {"overall_analysis": {"key_themes": ["a"]}}, "abc")
+    check = FeedCheck(changed=False, fetched=True, etag='"v3"', links=["https://writer.substack.com/p/old"])
+    daemon, analyzed = make_daemon(tmp_path, monkeypatch, check)
+
+    assert await daemon.refresh_once(PEAK) == {AUTHOR: "unchanged"}
+    assert analyzed == []
+    assert RefreshDaemon(None, authors=[], state_file=daemon.state_file).state["authors"][AUTHOR]["etag"] == '"v3"'
+    assert "checked_at" in load_analysis(AUTHOR)
+
+def test_stale_stored_analysis_is_not_served(tmp_path, monkeypatch):
+    from app.api.v1.endpoints import analysis
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(analysis, "tracked_author_url", lambda url: AUTHOR)
+    save_analysis(AUTHOR, {"overall_analysis": {"key_themes": ["a"]}}, "abc")
+    assert analysis.serve_stored_analysis(AUTHOR) is not None
+
+    monkeypatch.setattr(analysis, "STORED_ANALYSIS_MAX_AGE", -1)
+    assert analysis.serve_stored_analysis(AUTHOR) is None
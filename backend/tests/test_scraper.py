@@ -54,4 +54,170 @@ async def test_scrape_substack_with_csv():
 @pytest.mark.asyncio
 async def test_unsupported_platform():
     with pytest.raises(ValueError):
-        await scrape_url("username", "unsupported_platform")
\ No newline at end of file
+        await scrape_url("username", "unsupported_platform")
+
+HTML_FIXTURES = [
+    '<p>Hello <b>world</b>&nbsp;!</p><script>var x="y";</script><p>Second\n\n para &amp; "quotes"</p>',
+    '<div><!-- comment --><h2>Title</h2><ul><li>one<li>two</ul><style>.a{}</style><br/>tail</div>',
+    '<figure><img src="x"><figcaption>cap  tion</figcaption></figure><pre>  code\n  block </pre>',
+    '<template><p>hidden</p></template><p>shown</p>',
+    'plain text only',
+]
+
+@pytest.mark.parametrize("html", HTML_FIXTURES)
+def test_clean_html_content_matches_beautifulsoup(html):
+    from bs4 import BeautifulSoup
+    from app.utils.scraper import clean_content, clean_html_content
+
+    expected = clean_content(BeautifulSoup(html, 'html.parser').get_text(separator=' ', strip=True))
+    assert clean_html_content(html) == expected
+
+
+SUBSTACK_POST_PAGE = """
+<html><head><title>ignored</title><script>window._preloads = {"title": "x"};</script></head>
+<body>
+  <div class="post-header">
+    <h1 class="post-title published">A <em>Title</em> &amp; more</h1>
+    <h3 class="subtitle">The  subtitle</h3>
+    <div class="pencraft pc-display-flex pc-gap-4 pc-reset">
+      <div class="pencraft pc-reset">Mar 3, 2024</div>
+    </div>
+    <a class="post-ufi-button like-button"><svg><path d="M0"/></svg><div class="label">42</div></a>
+  </div>
+  <div class="available-content"><div class="body markup">
+    <p>First "quoted" paragraph<br>with a break.</p>
+    <h2>Section heading</h2>
+    <ul><li>one<li>two</ul>
+    <style>.hidden { display: none; }</style>
+    <p>Last paragraph.</p>
+  </div></div>
+  <div class="footer"><h2>Discussion</h2></div>
+</body></html>
+"""
+
+@pytest.mark.parametrize("html", [SUBSTACK_POST_PAGE, "<html><body><p>Nothing useful</p></body></html>"])
+def test_extract_post_data_matches_soup_selectors(html):
+    from bs4 import BeautifulSoup
+    from app.models.records import Post
+    from app.utils.scraper import BaseSubstackScraper, clean_content
+
+    soup = BeautifulSoup(html, "html.parser")
+    def text_of(selector, default):
+        element = soup.select_one(selector)
+        return element.text.strip() if element else default
+    content_element = soup.select_one("div.available-content")
+    expected = Post.from_strings(
+        title=clean_content(text_of("h1.post-title, h2", "No title")),
+        subtitle=clean_content(text_of("h3.subtitle", "")),
+        url="https://a.substack.com/p/post",
+        content=clean_content(content_element.get_text(separator=' ', strip=True) if content_element else "No content"),
+        date=clean_content(text_of(".pencraft.pc-display-flex.pc-gap-4.pc-reset .pencraft", "Date not available")),
+        like_count=clean_content(text_of("a.post-ufi-button .label", "Like count not available")),
+    )
+
+    scraper = BaseSubstackScraper.__new__(BaseSubstackScraper)
+    assert scraper.extract_post_data(html, "https://a.substack.com/p/post") == expected
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://a.substack.com/sitemap-1.xml</loc></sitemap>
+  <sitemap><loc>https://a.substack.com/sitemap-2.xml.gz</loc></sitemap>
+  <sitemap><loc>https://a.substack.com/sitemap-1.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+def _urlset(*entries):
+    urls = "".join(f"<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>" for loc, lastmod in entries)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+
+def test_iter_sitemap_streams_entries_with_lastmod():
+    import io
+    from app.utils.scraper import iter_sitemap
+
+    entries = list(iter_sitemap(io.BytesIO(_urlset(("https://a.substack.com/p/one", "2024-03-01T12:00:00+00:00")))))
+    assert [(kind, loc) for kind, loc, _ in entries] == [("url", "https://a.substack.com/p/one")]
+    assert entries[0][2].isoformat() == "2024-03-01T12:00:00+00:00"
+    assert [kind for kind, _, _ in iter_sitemap(io.BytesIO(SITEMAP_INDEX))] == ["sitemap"] * 3
+
+def test_sitemap_index_is_followed_and_filtered(monkeypatch):
+    import gzip
+    import io
+    from app.utils import scraper as scraper_module
+    from app.utils.scraper import BaseSubstackScraper
+
+    bodies = {
+        "https://a.substack.com/sitemap.xml": SITEMAP_INDEX,
+        "https://a.substack.com/sitemap-1.xml": _urlset(("https://a.substack.com/p/one", "2024-03-01"), ("https://a.substack.com/about", "2024-01-01")),
+        "https://a.substack.com/sitemap-2.xml.gz": gzip.compress(_urlset(("https://a.substack.com/p/two", "2024-04-01"), ("https://a.substack.com/p/one", "2024-03-01"))),
+    }
+    fetched = []
+
+    class FakeResponse:
+        ok = True
+        def __init__(self, body):
+            self.raw = io.BytesIO(body)
+        def close(self):
+            pass
+
+    def fake_get(self, url, stream=False):
+        fetched.append(url)
+        return FakeResponse(bodies[url])
+
+    monkeypatch.setattr(scraper_module.crawl_scheduler, "sitemaps_blocking", lambda url: ["https://a.substack.com/sitemap.xml"])
+    monkeypatch.setattr(BaseSubstackScraper, "polite_get", fake_get)
+    scraper = BaseSubstackScraper.__new__(BaseSubstackScraper)
+    scraper.base_substack_url = "https://a.substack.com/"
+    scraper.keywords = ["about", "archive", "podcast"]
+    scraper.lastmod = {}
+
+    assert sorted(scraper.iter_post_urls()) == ["https://a.substack.com/p/one", "https://a.substack.com/p/two"]
+    assert sorted(fetched) == sorted(bodies)
+    assert scraper.lastmod["https://a.substack.com/p/two"].date().isoformat() == "2024-04-01"
+
+@pytest.mark.asyncio
+async def test_scrape_url_stores_posts_in_corpus(monkeypatch, tmp_path):
+    from app.models.records import Post
+    from app.utils import scraper as scraper_module
+    from app.utils.corpus_store import read_posts
+
+    async def fake_scrape_substack(url, priority):
+        return {'posts': [Post.from_strings(title="One", subtitle="", url=f"{url}p/one", content="First essay.", date="2024-03-01", like_count="N/A")]}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper_module, "scrape_substack", fake_scrape_substack)
+
+    await scrape_url("https://writer.substack.com/p/whatever")
+    await scrape_url("https://writer.substack.com/")
+
+    stored = read_posts("writer", columns=["url", "content"])
+    assert stored.to_dict("records") == [{"url": "https://writer.substack.com/p/one", "content": "First essay."}]
+    assert scraper_module.author_key("https://medium.com/@someone") == "someone"
+
+def test_scrape_posts_takes_the_newest_and_skips_unchanged(monkeypatch):
+    from datetime import datetime, timezone
+    from app.models.records import Post
+    from app.utils.scraper import BaseSubstackScraper
+
+    lastmods = {
+        "https://a.substack.com/p/old": datetime(2023, 1, 1, tzinfo=timezone.utc),
+        "https://a.substack.com/p/newest": datetime(2024, 5, 1, tzinfo=timezone.utc),
+        "https://a.substack.com/p/undated": None,
+        "https://a.substack.com/p/newer": datetime(2024, 4, 1, tzinfo=timezone.utc),
+    }
+
+    def iter_post_urls(self):
+        # Nested sitemaps arrive in any order
+        for url, lastmod in lastmods.items():
+            self.lastmod[url] = lastmod
+            yield url
+
+    monkeypatch.setattr(BaseSubstackScraper, "iter_post_urls", iter_post_urls)
+    monkeypatch.setattr(BaseSubstackScraper, "get_url_html", lambda self, url: "<html></html>")
+    monkeypatch.setattr(BaseSubstackScraper, "extract_post_data", lambda self, html, url: Post.from_strings(title="", subtitle="", url=url, content="", date="", like_count=""))
+    scraper = BaseSubstackScraper.__new__(BaseSubstackScraper)
+    scraper.lastmod = {}
+
+    assert [post.url for post in scraper.scrape_posts(2)] == ["https://a.substack.com/p/newest", "https://a.substack.com/p/newer"]
+
+    known = dict(scraper.lastmod, **{"https://a.substack.com/p/newer": datetime(2024, 3, 1, tzinfo=timezone.utc)})
+    assert sorted(post.url for post in scraper.scrape_posts(known_lastmod=known)) == ["https://a.substack.com/p/newer", "https://a.substack.com/p/undated"]
@@ -0,0 +1,52 @@
+# backend/tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_unit_of_work():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"insights": {"key_themes": ["a"]}}
+
+    results = await asyncio.gather(*(flight.do("same essay", work) for _ in range(10)))
+    assert calls == 1
+    assert flight.coalesced == 9
+    assert all(result == results[0] for result in results)
+    assert len(flight) == 0
+
+    await flight.do("same essay", work)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "done"
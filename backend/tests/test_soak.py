@@ -0,0 +1,23 @@
+# backend/tests/test_soak.py
+
+import httpx
+
+from loadtest.soak import parse_args, run_soak
+from loadtest.stubs import REAL_ASYNC_CLIENT
+
+def test_short_soak_run_completes_every_session():
+    args = parse_args([
+        "--duration", "2", "--rate", "5", "--authors", "4", "--fast-ratio", "0.5",
+        "--poll-interval", "0.2", "--sample-interval", "0.5", "--llm-latency", "0.01", "--feed-latency", "0.01",
+    ])
+    report = run_soak(args)
+
+    assert report["sessions"]["started"] == report["sessions"]["completed"] >= 10
+    assert report["upstream_calls"]["feed"] >= 1
+    assert report["upstream_calls"].get("unknown", 0) == 0
+    assert report["latency_seconds"]["post"]["count"] == report["sessions"]["started"]
+    assert report["http_statuses"].get("status_revalidate:304", 0) > 0
+    assert report["event_loop_lag_seconds"]["count"] > 0
+    assert report["task_store"]["last"]["tasks"] >= report["task_store"]["first"]["tasks"]
+    # The service's httpx clients are real again afterwards
+    assert httpx.AsyncClient is REAL_ASYNC_CLIENT
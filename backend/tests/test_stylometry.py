@@ -0,0 +1,48 @@
+# backend/tests/test_stylometry.py
+
+import pytest
+
+from app.models.records import EssayInsights
+from app.services.stylometry import aggregate_style, describe_style
+from app.services.text_processor import mtld, process_text
+
+def essay(word_count, sentence_count, readability, sentiment, compound, mean_length, std_length, richness=90.0):
+    return EssayInsights("h", [], sentence_count, word_count, readability, sentiment, compound, mean_length, std_length, richness)
+
+def test_process_text_measures_style():
+    processed = process_text("Short one. This sentence is a little bit longer than that. Great!")
+    assert processed.sentence_count == 3
+    assert processed.mean_sentence_length == pytest.approx(12 / 3)
+    assert processed.sentence_length_std > 0
+    assert processed.vocabulary_richness > 0
+    assert -1 <= processed.sentiment_score <= 1
+
+def test_aggregate_style_weights_and_pools():
+    essays = [
+        essay(900, 30, 60.0, "positive", 0.6, 30.0, 5.0),
+        essay(100, 10, 20.0, "negative", -0.5, 10.0, 5.0),
+        essay(100, 10, 20.0, "positive", 0.1, 10.0, 5.0),
+    ]
+    style = aggregate_style(essays)
+
+    assert style["readability_score"] == pytest.approx((900 * 60 + 200 * 20) / 1100, abs=0.05)
+    assert style["sentiment"] == "Positive"
+    assert style["sentiment_distribution"] == {"positive": 0.667, "neutral": 0.0, "negative": 0.333}
+    metrics = style["style_metrics"]
+    assert metrics["mean_sentence_length"] == pytest.approx(22.0)
+    # Pooled over all sentences, so wider than any single essay's spread
+    assert metrics["sentence_length_std"] > 5.0
+    assert metrics["total_words"] == 1100
+    assert style["writing_style"] == describe_style(style["readability_score"], 22.0, 90.0, metrics["sentiment_score"])
+
+def test_aggregate_style_without_essays():
+    assert aggregate_style([])["sentiment"] == "Unknown"
+
+@pytest.mark.parametrize("richness, vocabulary", [(55.0, "a plain vocabulary"), (90.0, "an everyday vocabulary"), (140.0, "a varied vocabulary")])
+def test_describe_style_vocabulary_bands(richness, vocabulary):
+    assert vocabulary in describe_style(60.0, 18.0, richness, 0.0)
+
+def test_mtld_does_not_grow_with_length():
+    words = "the cat sat on the mat while the dog slept by the door".split()
+    assert mtld(words * 4) == pytest.approx(mtld(words * 40), rel=0.1)
+    assert mtld([]) == 0.0